@@ -0,0 +1,276 @@
+# catalog_query.py
+# Kleine Query-Engine über den Katalog (für /brainrot search & Co.).
+#
+# Der Katalog wird einmal pro Version in Spalten zerlegt: jedes Item bekommt eine
+# Position, jeder Spaltenwert (Rarity, Type, Set) eine Bitmaske über alle Positionen
+# (Python-int als Bitset). Wert-/Kosten-Bereiche laufen über sortierte Spalten +
+# Präfix-Masken. Ein Filter ist damit ein paar AND/OR über ganze Masken statt einer
+# Schleife über alle Items.
+#
+# Kompilierte Pläne (statische Maske + Sortierung) werden pro Query gecacht; beim
+# Ausführen kommt nur noch die Besitz-Maske des Users dazu.
+# Jeder Plan hat eine kompakte Textform seiner Filter (`plan.arg`) für custom_ids –
+# Buttons kompilieren daraus neu und hängen so weder am Cache noch an der Katalog-Version.
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+
+from ownership import INDEX_BITS
+
+RARITY_ORDER = ["Common", "Rare", "Epic", "Legendary", "Mythical", "Brainrot God", "Secret", "OG"]
+
+# Sortierung → (Spalte, absteigend)
+SORTS = {
+    "value_desc": ("wert", True),
+    "value_asc": ("wert", False),
+    "cost_desc": ("kosten", True),
+    "cost_asc": ("kosten", False),
+    "rarity": ("rarity", False),
+    "name": ("name", False),
+}
+
+_SUFFIXES = {"": 1, "k": 1_000, "m": 1_000_000, "b": 1_000_000_000, "t": 1_000_000_000_000}
+_NUMBER = re.compile(r"\s*([0-9]+(?:[.,][0-9]+)?)\s*([kmbt]?)\s*", re.IGNORECASE)
+
+
+def parse_number(text: str) -> int:
+    """'1.5M' → 1500000 (Suffixe K/M/B/T wie in format_number)."""
+    match = _NUMBER.fullmatch(text)
+    if not match:
+        raise ValueError(f"Invalid number: `{text}`")
+    return int(float(match[1].replace(",", ".")) * _SUFFIXES[match[2].lower()])
+
+
+def format_amount(value: int) -> str:
+    """Kürzeste Schreibweise, die parse_number wieder exakt zu `value` macht (1500000 → '1.5M')."""
+    for suffix, factor in reversed(_SUFFIXES.items()):
+        if factor > 1 and value >= factor:
+            text = f"{value / factor:.6g}{suffix.upper()}"
+            if parse_number(text) == value:
+                return text
+    return str(value)
+
+
+def format_range(lo: int | None, hi: int | None) -> str:
+    """Gegenstück zu parse_range in kanonischer Form."""
+    if lo is None and hi is None:
+        return ""
+    if lo == hi:
+        return format_amount(lo)
+    return f"{format_amount(lo) if lo is not None else ''}-{format_amount(hi) if hi is not None else ''}"
+
+
+def parse_range(text: str) -> tuple[int | None, int | None]:
+    """'1M-5B', '1M-' (ab), '-5B' (bis) oder '1M' (genau) → (min, max)."""
+    text = text.strip()
+    if not text:
+        return None, None
+    if "-" not in text:
+        value = parse_number(text)
+        return value, value
+    lo, hi = text.split("-", 1)
+    lo = parse_number(lo) if lo.strip() else None
+    hi = parse_number(hi) if hi.strip() else None
+    if lo is not None and hi is not None and lo > hi:
+        raise ValueError(f"Invalid range: `{text}` (min > max)")
+    return lo, hi
+
+
+def iter_bits(mask: int):
+    """Positionen der gesetzten Bits, aufsteigend."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def item_types(data: dict) -> list[str]:
+    """`type` steht im Katalog mal als Liste, mal als Komma-String."""
+    types = data.get("type") or []
+    if isinstance(types, str):
+        types = [x.strip() for x in types.split(",") if x.strip()]
+    return types
+
+
+class CatalogColumns:
+    """Spaltenweise Sicht auf eine Katalog-Version (ItemIds.by_id)."""
+
+    def __init__(self, items_by_id: dict, names: dict, version: int = 0):
+        self.version = version
+        self.ids = list(items_by_id)                        # Position → item_id
+        self.pos = {item_id: i for i, item_id in enumerate(self.ids)}
+        self.all = (1 << len(self.ids)) - 1
+
+        self.rarity: dict[str, int] = {}                    # lowercase Wert → Maske
+        self.type: dict[str, int] = {}
+        self.set: dict[str, int] = {}
+        wert = []
+        kosten = []
+        rarity_rank = []
+        for i, item_id in enumerate(self.ids):
+            data = items_by_id[item_id]
+            bit = 1 << i
+            rarity = data.get("rarity") or ""
+            self.rarity[rarity.lower()] = self.rarity.get(rarity.lower(), 0) | bit
+            for t in item_types(data):
+                self.type[t.lower()] = self.type.get(t.lower(), 0) | bit
+            for s in data.get("fixed_sets") or []:
+                self.set[s.lower()] = self.set.get(s.lower(), 0) | bit
+            wert.append(data.get("wert") or 0)
+            kosten.append(data.get("kosten") or 0)
+            rarity_rank.append(RARITY_ORDER.index(rarity) if rarity in RARITY_ORDER else len(RARITY_ORDER))
+
+        self._numeric = {"wert": self._sorted_column(wert), "kosten": self._sorted_column(kosten)}
+        # Rang jeder Position pro Sortierspalte (Gleichstand → Katalog-Reihenfolge)
+        keys = {
+            "wert": wert,
+            "kosten": kosten,
+            "rarity": [(r, w) for r, w in zip(rarity_rank, wert)],
+            "name": [names[item_id].lower() for item_id in self.ids],
+        }
+        self.rank = {}
+        for column, values in keys.items():
+            order = sorted(range(len(values)), key=values.__getitem__)
+            rank = [0] * len(order)
+            for r, i in enumerate(order):
+                rank[i] = r
+            self.rank[column] = rank
+
+    @staticmethod
+    def _sorted_column(values: list) -> tuple[list, list[int]]:
+        """(sortierte Werte, Präfix-Masken): prefix[k] = Maske der k kleinsten Werte."""
+        order = sorted(range(len(values)), key=values.__getitem__)
+        prefix = [0]
+        for i in order:
+            prefix.append(prefix[-1] | (1 << i))
+        return [values[i] for i in order], prefix
+
+    def range_mask(self, column: str, lo: int | None, hi: int | None) -> int:
+        values, prefix = self._numeric[column]
+        start = bisect_left(values, lo) if lo is not None else 0
+        end = bisect_right(values, hi) if hi is not None else len(values)
+        return prefix[end] ^ prefix[start] if end > start else 0
+
+    def mask_of(self, item_ids) -> int:
+        mask = 0
+        pos = self.pos
+        for item_id in item_ids:
+            i = pos.get(item_id)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+
+class QueryPlan:
+    __slots__ = ("key", "arg", "mask", "own_bit", "own_mode", "rank", "descending", "summary")
+
+    def __init__(self, key: tuple, mask: int, own_bit: int, own_mode: str, rank: list, descending: bool, summary: str):
+        self.key = key
+        self.arg = encode_filters(key)  # für custom_ids, siehe CatalogQuery.from_arg
+        self.mask = mask              # alle statischen Filter (Rarity, Type, Set, Bereiche) verknüpft
+        self.own_bit = own_bit        # Index-Bit für owned/missing, 0 = egal
+        self.own_mode = own_mode      # "owned" | "missing" | ""
+        self.rank = rank
+        self.descending = descending
+        self.summary = summary        # lesbare Beschreibung für Footer
+
+
+def encode_filters(key: tuple) -> str:
+    """
+    Plan-Key → 'rarity|type|set|wert|kosten|owned|sort' ohne ':' (custom_id-Trenner):
+    Texte URL-kodiert, Bereiche kanonisch, owned als o/m + Index-Bit, sort als Position in SORTS.
+    """
+    rarity, type, set, wert_range, kosten_range, owned, index, sort = key[:8]
+    own = f"{owned[0]}{list(INDEX_BITS).index(index)}" if owned else ""
+    return "|".join([quote(rarity, safe=" "), quote(type, safe=" "), quote(set, safe=" "),
+                     format_range(*wert_range), format_range(*kosten_range), own, str(list(SORTS).index(sort))])
+
+
+class CatalogQuery:
+    """Kompiliert Filter zu Plänen (LRU-gecacht) und führt sie gegen einen Besitzstand aus."""
+
+    def __init__(self, columns: CatalogColumns, max_plans: int = 256):
+        self.columns = columns
+        self.max_plans = max_plans
+        self._plans: OrderedDict[tuple, QueryPlan] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, rarity: str = "", type: str = "", set: str = "", wert: str = "", kosten: str = "",
+                owned: str = "", index: str = "", sort: str = "value_desc") -> QueryPlan:
+        """
+        Alle Filter sind optional und werden UND-verknüpft. `wert`/`kosten` als Bereich
+        ('1M-5B', '1M-', '-5B'); owned = "owned"/"missing" bezieht sich auf `index`.
+        ValueError bei ungültiger Eingabe.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Invalid sort! Use one of: {', '.join(SORTS)}")
+        if owned not in ("", "owned", "missing"):
+            raise ValueError("Invalid owned filter! Use `owned` or `missing`")
+        if owned and index not in INDEX_BITS:
+            raise ValueError(f"The owned/missing filter needs an index: {', '.join(INDEX_BITS)}")
+        wert_range = parse_range(wert)
+        kosten_range = parse_range(kosten)
+
+        key = (rarity.lower().strip(), type.lower().strip(), set.lower().strip(),
+               wert_range, kosten_range, owned, index if owned else "", sort, self.columns.version)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+        self.misses += 1
+        cols = self.columns
+        mask = cols.all
+        summary = []
+        if key[0]:
+            mask &= cols.rarity.get(key[0], 0)
+            summary.append(f"rarity {rarity}")
+        if key[1]:
+            mask &= cols.type.get(key[1], 0)
+            summary.append(f"type {type}")
+        if key[2]:
+            mask &= cols.set.get(key[2], 0)
+            summary.append(f"set {set}")
+        if wert_range != (None, None):
+            mask &= cols.range_mask("wert", *wert_range)
+            summary.append(f"value {format_range(*wert_range)}")
+        if kosten_range != (None, None):
+            mask &= cols.range_mask("kosten", *kosten_range)
+            summary.append(f"cost {format_range(*kosten_range)}")
+        if owned:
+            if index == "Candy":
+                mask &= cols.set.get("candy", 0)  # Candy gibt es nur für Items aus dem Candy-Set
+            summary.append(f"{owned} in {index}")
+
+        column, descending = SORTS[sort]
+        plan = QueryPlan(key, mask, INDEX_BITS.get(key[6], 0), owned, cols.rank[column], descending, ", ".join(summary) or "everything")
+        self._plans[key] = plan
+        while len(self._plans) > self.max_plans:
+            self._plans.popitem(last=False)
+        return plan
+
+    def from_arg(self, arg: str) -> QueryPlan:
+        """Plan aus `plan.arg` (Buttons) gegen den aktuellen Katalog kompilieren. ValueError bei Unsinn."""
+        parts = arg.split("|")
+        if len(parts) != 7:
+            raise ValueError(f"Invalid search filters: `{arg}`")
+        rarity, type, set, wert, kosten, own, sort = parts
+        owned = index = ""
+        if own:
+            owned = {"o": "owned", "m": "missing"}.get(own[0], "?")
+            index = list(INDEX_BITS)[int(own[1:])]
+        return self.compile(rarity=unquote(rarity), type=unquote(type), set=unquote(set), wert=wert, kosten=kosten,
+                            owned=owned, index=index, sort=list(SORTS)[int(sort)])
+
+    def run(self, plan: QueryPlan, owns: dict | None = None) -> list[int]:
+        """Item-ids, die den Plan erfüllen, sortiert. `owns` = {item_id: flags} des Users (für owned/missing)."""
+        cols = self.columns
+        mask = plan.mask
+        if plan.own_mode:
+            owned = cols.mask_of(item_id for item_id, flags in (owns or {}).items() if flags & plan.own_bit)
+            mask = mask & owned if plan.own_mode == "owned" else mask & ~owned
+        positions = sorted(iter_bits(mask), key=plan.rank.__getitem__, reverse=plan.descending)
+        return [cols.ids[i] for i in positions]
@@ -0,0 +1,273 @@
+# catalog_refresh.py
+# Katalog-Updates von einer konfigurierbaren URL statt Handarbeit an brainrot_db.json.
+#
+# - Bedingte Requests (If-None-Match / If-Modified-Since) → 304 kostet fast nichts
+# - Ergebnis wird als Diff (neu / entfernt / geändert) geliefert; anwenden macht der Bot
+# - Bild-URLs werden gesammelt geprüft (HEAD, begrenzte Parallelität) und das Ergebnis
+#   mit Ablaufzeit gecacht – set_thumbnail_if_valid fragt nur noch den Cache
+# Validatoren und Bild-Cache liegen in einer kleinen JSON-Statusdatei.
+# Eine ClientSession (Connection-Pool) für alles; hängt nur von aiohttp ab.
+#
+# Selbsttest gegen einen lokalen HTTP-Stand-in:  python catalog_refresh.py selftest
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+
+class CatalogDiff:
+    __slots__ = ("added", "removed", "changed")
+
+    def __init__(self, added: list[str], removed: list[str], changed: list[str]):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self) -> str:
+        return f"+{len(self.added)} −{len(self.removed)} ~{len(self.changed)}"
+
+
+def diff_catalog(old: dict, new: dict) -> CatalogDiff:
+    """Vergleich per Item-Name; geändert = irgendein Feld anders."""
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    changed = [name for name in new if name in old and new[name] != old[name]]
+    return CatalogDiff(added, removed, changed)
+
+
+def validate_catalog(data) -> dict:
+    """Gleiches Format wie brainrot_db.json: {name: {"id": int, ...}}. ValueError sonst."""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("catalog must be a non-empty object")
+    seen = {}
+    for name, item in data.items():
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            raise ValueError(f"'{name}' has no valid id")
+        if item["id"] in seen:
+            raise ValueError(f"'{name}' and '{seen[item['id']]}' share id {item['id']}")
+        seen[item["id"]] = name
+    return data
+
+
+class CatalogRefresher:
+    def __init__(self, url: str | None, state_path: str, concurrency: int = 8,
+                 image_ttl: float = 6 * 3600, timeout: float = 15):
+        self.url = url
+        self.state_path = state_path
+        self.image_ttl = image_ttl
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: aiohttp.ClientSession | None = None
+        self._pending: dict | None = None  # Validatoren der zuletzt geholten, noch nicht übernommenen Version
+        state = self._load_state()
+        self.etag: str | None = state.get("etag")
+        self.last_modified: str | None = state.get("last_modified")
+        self._images: dict[str, tuple[bool, float]] = {}
+        self._load_images(state)
+        self.not_modified = 0
+        self.fetched = 0
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return {}
+
+    def _load_images(self, state: dict):
+        self._images = {url: (ok, ts) for url, (ok, ts) in state.get("images", {}).items()}
+
+    def reload_state(self):
+        """Bild-Cache neu einlesen, den ein anderer Prozess geschrieben hat (Sharded-Betrieb)."""
+        self._load_images(self._load_state())
+
+    def save_state(self):
+        data = {"etag": self.etag, "last_modified": self.last_modified,
+                "images": {url: [ok, ts] for url, (ok, ts) in self._images.items()}}
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"  # eigene tmp-Datei pro Prozess
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.state_path)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self._timeout,
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+                headers={"User-Agent": "brainrot-tracker-bot"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    # ───── Katalog ─────
+    async def fetch(self) -> dict | None:
+        """
+        Neuer Katalog oder None bei 304. Die Validatoren gelten erst nach commit() –
+        schlägt das Anwenden fehl, wird beim nächsten Mal wieder voll geladen.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        session = await self._get_session()
+        async with session.get(self.url, headers=headers) as resp:
+            if resp.status == 304:
+                self.not_modified += 1
+                return None
+            resp.raise_for_status()
+            body = await resp.read()
+            validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        # Großes JSON nicht auf dem Event-Loop parsen
+        data = await asyncio.to_thread(lambda: validate_catalog(json.loads(body)))
+        self.fetched += 1
+        self._pending = validators
+        return data
+
+    def commit(self):
+        """Zuletzt geholte Version als übernommen markieren (Validatoren speichern)."""
+        if self._pending is not None:
+            self.etag = self._pending["etag"]
+            self.last_modified = self._pending["last_modified"]
+            self._pending = None
+            self.save_state()
+
+    # ───── Bild-URLs ─────
+    def image_ok(self, url: str) -> bool | None:
+        """Gecachtes Prüfergebnis; None = noch nicht (oder nicht mehr aktuell) geprüft."""
+        entry = self._images.get(url)
+        if entry is None or time.time() - entry[1] > self.image_ttl:
+            return None
+        return entry[0]
+
+    @staticmethod
+    def _image_result(resp: aiohttp.ClientResponse) -> bool | None:
+        if resp.status == 429 or resp.status >= 500:
+            return None  # vorübergehend → nicht als kaputt merken
+        return resp.status == 200 and resp.content_type.startswith("image/")
+
+    async def _check_image(self, session: aiohttp.ClientSession, url: str) -> bool | None:
+        async with self._semaphore:
+            try:
+                async with session.head(url, allow_redirects=True) as resp:
+                    if resp.status == 405:  # HEAD nicht erlaubt → GET, Body wird nicht gelesen
+                        async with session.get(url) as get_resp:
+                            return self._image_result(get_resp)
+                    return self._image_result(resp)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return None  # Netzproblem ≠ kaputte URL → nicht cachen, nächste Runde erneut
+
+    async def check_images(self, urls, force: bool = False) -> tuple[int, list[str]]:
+        """Prüft alle (noch nicht gecachten) http(s)-URLs. Liefert (#geprüft, kaputte URLs)."""
+        todo = sorted({u for u in urls if u and u.startswith(("http://", "https://"))
+                       and (force or self.image_ok(u) is None)})
+        if not todo:
+            return 0, []
+        session = await self._get_session()
+        results = await asyncio.gather(*(self._check_image(session, u) for u in todo))
+        now = time.time()
+        for url, ok in zip(todo, results):
+            if ok is not None:
+                self._images[url] = (ok, now)
+        self.save_state()
+        return len(todo), [u for u, ok in zip(todo, results) if ok is False]
+
+
+# ───── Selbsttest: lokaler Stand-in für Katalog + Bilder ─────
+async def _selftest(state_path: str) -> bool:
+    from aiohttp import web
+
+    catalog = {"A": {"id": 1, "image": None}, "B": {"id": 2, "image": None}}
+    hits = {"catalog": 0, "images": 0}
+    active = {"now": 0, "peak": 0}
+
+    async def serve_catalog(request):
+        hits["catalog"] += 1
+        etag = f'"v{len(catalog)}-{sum(i["id"] for i in catalog.values())}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.json_response(catalog, headers={"ETag": etag})
+
+    async def serve_image(request):
+        hits["images"] += 1
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+        if request.match_info["name"].startswith("ok"):
+            return web.Response(body=b"\x89PNG", content_type="image/png")
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/catalog.json", serve_catalog)
+    app.router.add_route("*", "/img/{name}", serve_image)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    refresher = CatalogRefresher(f"{base}/catalog.json", state_path, concurrency=3)
+    try:
+        first = await refresher.fetch()
+        refresher.commit()
+        second = await refresher.fetch()                 # unverändert → 304
+        catalog["C"] = {"id": 3, "image": f"{base}/img/ok-c.png"}
+        third = await refresher.fetch()                  # geändert → Diff
+        diff = diff_catalog(first, third)
+        refresher.commit()
+        restarted = CatalogRefresher(f"{base}/catalog.json", state_path)
+        fourth = await restarted.fetch()                 # Validatoren überleben den Neustart
+        await restarted.close()
+
+        urls = [f"{base}/img/ok-{i}.png" for i in range(10)] + [f"{base}/img/bad-{i}.png" for i in range(4)]
+        checked, bad = await refresher.check_images(urls)
+        again, _ = await refresher.check_images(urls)    # alles gecacht
+    finally:
+        await refresher.close()
+        await runner.cleanup()
+
+    checks = [
+        ("erster Abruf liefert Katalog", first is not None),
+        ("unverändert → 304", second is None),
+        (f"Änderung → Diff {diff}", str(diff) == "+1 −0 ~0"),
+        (f"Validatoren überleben Neustart ({hits['catalog']} Requests)", fourth is None),
+        (f"{checked} Bilder geprüft", checked == 14),
+        (f"{len(bad)} kaputte Bilder erkannt", len(bad) == 4),
+        ("zweiter Lauf komplett aus dem Cache", again == 0),
+        (f"max. {active['peak']} parallel (Limit 3)", active["peak"] <= 3),
+        ("image_ok merkt sich Ergebnisse", refresher.image_ok(urls[0]) is True and refresher.image_ok(urls[-1]) is False),
+    ]
+    ok = all(passed for _, passed in checks)
+    for name, passed in checks:
+        print(f"  {'OK    ' if passed else 'FEHLER'} {name}")
+    print(f"Katalog-Refresh gegen lokalen Stand-in: {'OK' if ok else 'FEHLER'}")
+    os.remove(state_path)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog refresh tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    test = sub.add_parser("selftest", help="fetch/304/diff and image checks against a local stand-in")
+    test.add_argument("--state", default="catalog_selftest_state.json")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(_selftest(args.state)) else 1)
+
+
+if __name__ == "__main__":
+    main()
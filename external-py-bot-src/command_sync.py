@@ -0,0 +1,110 @@
+# command_sync.py
+# Slash-Command-Sync nur, wenn sich der Command-Baum wirklich geändert hat.
+#
+# Der Hash läuft über genau das, was tree.sync() an Discord schickt (Gruppe, Commands,
+# Parameter, Beschreibungen, Choices …) und wird pro (Application, Ziel) gespeichert.
+# on_ready feuert auch bei Gateway-Reconnects – mit gleichem Hash wird dann nichts gesynct.
+# Guilds, die früher gesynct wurden und nicht mehr Ziel sind, werden einmal geleert –
+# sonst stehen dort die Guild-Kopien neben den globalen Commands doppelt.
+import hashlib
+import json
+import os
+import time
+
+import discord
+from discord import app_commands
+
+
+def parse_targets(value: str) -> list[int | None]:
+    """'global,123,456' → [None, 123, 456]; leer → nur global."""
+    targets = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        targets.append(None if part == "global" else int(part))
+    return targets or [None]
+
+
+def tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Stabiler Hash des Sync-Payloads für ein Ziel (None = global)."""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """Zuletzt erfolgreich gesyncte Hashes, Schlüssel '<application_id>:<guild_id|global>'."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._hashes: dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    self._hashes = json.load(f)
+                except json.JSONDecodeError:
+                    self._hashes = {}
+
+    @staticmethod
+    def key(application_id: int, guild_id: int | None) -> str:
+        return f"{application_id}:{guild_id or 'global'}"
+
+    def get(self, application_id: int, guild_id: int | None) -> str | None:
+        return self._hashes.get(self.key(application_id, guild_id))
+
+    def set(self, application_id: int, guild_id: int | None, digest: str):
+        self._hashes[self.key(application_id, guild_id)] = digest
+        self._save()
+
+    def forget(self, application_id: int, guild_id: int | None):
+        if self._hashes.pop(self.key(application_id, guild_id), None) is not None:
+            self._save()
+
+    def guilds(self, application_id: int) -> list[int]:
+        """Guilds, in die diese Application zuletzt gesynct hat."""
+        prefix = f"{application_id}:"
+        return [int(k[len(prefix):]) for k in self._hashes if k.startswith(prefix) and k[len(prefix):] != "global"]
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._hashes, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, application_id: int, targets: list[int | None],
+                          state: CommandSyncState, force: bool = False):
+    """Synct jedes Ziel (Guild-id oder None = global), dessen Hash sich geändert hat."""
+    for guild_id in targets:
+        guild = discord.Object(id=guild_id) if guild_id else None
+        label = f"guild {guild_id}" if guild_id else "global"
+        start = time.perf_counter()
+        if guild:
+            tree.copy_global_to(guild=guild)  # globale Befehle sofort im Guild sichtbar
+        digest = tree_hash(tree, guild)
+        if not force and state.get(application_id, guild_id) == digest:
+            print(f"[SYNC] {label}: unverändert ({digest[:12]}) – übersprungen in {(time.perf_counter() - start) * 1000:.1f} ms")
+            continue
+        try:
+            synced = await tree.sync(guild=guild)
+        except discord.HTTPException as e:
+            print(f"[SYNC ERROR] {label}: {e}")
+            continue
+        state.set(application_id, guild_id, digest)
+        print(f"[SYNC] {label}: {len(synced)} Commands gesynct ({digest[:12]}) in {time.perf_counter() - start:.2f} s")
+
+    # Nicht mehr gewünschte Guild-Ziele leeren
+    for guild_id in state.guilds(application_id):
+        if guild_id in targets:
+            continue
+        guild = discord.Object(id=guild_id)
+        tree.clear_commands(guild=guild)
+        try:
+            await tree.sync(guild=guild)
+        except discord.HTTPException as e:
+            print(f"[SYNC ERROR] guild {guild_id} (leeren): {e}")
+            continue
+        state.forget(application_id, guild_id)
+        print(f"[SYNC] guild {guild_id}: kein Ziel mehr – Guild-Commands entfernt")
@@ -0,0 +1,248 @@
+# edit_coalescer.py
+# Zusammengefasste, rate-limit-bewusste Nachrichten-Edits (z.B. für den ItemEditorView).
+# Hängt nur von aiohttp ab (kommt mit discord.py) → lässt sich gegen einen lokalen
+# HTTP-Stand-in testen, indem man `api_base` auf den Stand-in zeigen lässt.
+#
+# Selbsttest gegen einen lokalen Stand-in mit 429/Retry-After:  python edit_coalescer.py selftest
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+import aiohttp
+
+DISCORD_API = "https://discord.com/api/v10"
+
+
+class EditFailed(Exception):
+    def __init__(self, status: int, text: str):
+        super().__init__(f"HTTP {status}: {text[:200]}")
+        self.status = status
+        self.text = text
+
+
+class _Bucket:
+    __slots__ = ("remaining", "reset_at", "lock")
+
+    def __init__(self):
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+class RateLimitedHTTP:
+    """
+    Kleiner REST-Client mit Discords Rate-Limit-Modell:
+      - X-RateLimit-Bucket ordnet Routen einem gemeinsamen Bucket zu
+      - X-RateLimit-Remaining / -Reset-After → vor dem nächsten Request warten statt 429 kassieren
+      - 429 → Retry-After (bzw. `retry_after` im Body) abwarten, global oder pro Bucket
+    Eine ClientSession (Connection-Pool) für alle Requests.
+    """
+
+    def __init__(self, api_base: str = DISCORD_API, max_retries: int = 5):
+        self.api_base = api_base.rstrip("/")
+        self.max_retries = max_retries
+        self._session: aiohttp.ClientSession | None = None
+        self._route_buckets: dict[str, str] = {}  # route-key → Bucket-Hash von Discord
+        self._buckets: dict[str, _Bucket] = {}
+        self._global_reset = 0.0
+        self.rate_limited = 0  # Anzahl erhaltener 429 (für Logs/Tests)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=20))
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _bucket(self, route_key: str) -> _Bucket:
+        key = self._route_buckets.get(route_key, route_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    def _update_from_headers(self, route_key: str, bucket: _Bucket, headers) -> _Bucket:
+        bucket_hash = headers.get("X-RateLimit-Bucket")
+        if bucket_hash and self._route_buckets.get(route_key) != bucket_hash:
+            # Route gehört zu einem (evtl. schon bekannten) Bucket → Zustand teilen
+            self._route_buckets[route_key] = bucket_hash
+            bucket = self._buckets.setdefault(bucket_hash, bucket)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None:
+            bucket.remaining = int(remaining)
+        if reset_after is not None:
+            bucket.reset_at = time.monotonic() + float(reset_after)
+        return bucket
+
+    async def _wait(self, bucket: _Bucket):
+        now = time.monotonic()
+        delay = self._global_reset - now
+        if bucket.remaining <= 0:
+            delay = max(delay, bucket.reset_at - now)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if bucket.remaining <= 0 and time.monotonic() >= bucket.reset_at:
+            bucket.remaining = 1
+
+    async def request(self, method: str, path: str, route_key: str, json=None):
+        session = await self._get_session()
+        url = self.api_base + path
+        for _ in range(self.max_retries + 1):
+            bucket = self._bucket(route_key)
+            async with bucket.lock:
+                await self._wait(bucket)
+                async with session.request(method, url, json=json) as resp:
+                    bucket = self._update_from_headers(route_key, bucket, resp.headers)
+                    if resp.status == 429:
+                        self.rate_limited += 1
+                        try:
+                            data = await resp.json(content_type=None) or {}
+                        except ValueError:
+                            data = {}
+                        retry_after = float(resp.headers.get("Retry-After") or data.get("retry_after") or 1)
+                        if resp.headers.get("X-RateLimit-Global") or data.get("global"):
+                            self._global_reset = time.monotonic() + retry_after
+                        else:
+                            bucket.remaining = 0
+                            bucket.reset_at = time.monotonic() + retry_after
+                        continue
+                    if resp.status >= 400:
+                        raise EditFailed(resp.status, await resp.text())
+                    if resp.status == 204:
+                        return None
+                    return await resp.json(content_type=None)
+        raise EditFailed(429, "rate limited, retries exhausted")
+
+    async def edit_original_response(self, application_id: int, token: str, payload: dict):
+        # Major parameter ist Webhook-ID + Token → eigener Bucket pro Interaction
+        path = f"/webhooks/{application_id}/{token}/messages/@original"
+        return await self.request("PATCH", path, route_key=f"PATCH {path}", json=payload)
+
+
+class EditCoalescer:
+    """
+    Fasst Zustandsänderungen einer Nachricht zu einem Edit zusammen.
+    `request()` kehrt sofort zurück; nach `window` Sekunden wird der *dann aktuelle*
+    Zustand gerendert und gesendet. Alles, was während des Wartens oder eines laufenden
+    (evtl. rate-limitierten) Edits dazukommt, landet im nächsten Edit.
+    """
+
+    def __init__(self, render: Callable[[], dict], send: Callable[[dict], Awaitable], window: float = 0.4):
+        self._render = render
+        self._send = send
+        self.window = window
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+        self.requested = 0
+        self.sent = 0
+
+    def request(self):
+        self.requested += 1
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while self._dirty:
+            await asyncio.sleep(self.window)
+            self._dirty = False
+            try:
+                await self._send(self._render())
+                self.sent += 1
+            except Exception as e:
+                print(f"[EDIT COALESCER] {e}")
+
+    async def flush(self):
+        """Wartet, bis alle angefragten Edits raus sind."""
+        if self._task is not None:
+            await self._task
+
+    def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+# ───── Selbsttest: lokaler Stand-in für den Webhook-Edit-Endpunkt ─────
+async def _selftest() -> bool:
+    from aiohttp import web
+
+    log: dict[str, list[tuple[float, int, int]]] = {}  # token → [(Zeit, Seite, Status)]
+
+    async def serve_edit(request):
+        token = request.match_info["token"]
+        page = (await request.json())["page"]
+        attempts = log.setdefault(token, [])
+        bucket = {"X-RateLimit-Bucket": f"bucket-{token}"}
+        if token == "limited" and not attempts:
+            attempts.append((time.monotonic(), page, 429))
+            return web.json_response({"message": "You are being rate limited.", "retry_after": 0.3, "global": False},
+                                     status=429, headers={**bucket, "Retry-After": "0.3"})
+        attempts.append((time.monotonic(), page, 200))
+        remaining = "0" if token == "drained" else "4"  # Bucket leer → Client muss Reset-After abwarten
+        return web.json_response({"id": "1"}, headers={**bucket, "X-RateLimit-Remaining": remaining,
+                                                       "X-RateLimit-Reset-After": "0.25"})
+
+    app = web.Application()
+    app.router.add_patch("/webhooks/{app_id}/{token}/messages/@original", serve_edit)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    http = RateLimitedHTTP(api_base=f"http://127.0.0.1:{port}")
+    state = {"page": 0}
+    coalescer = EditCoalescer(lambda: dict(state),
+                              lambda payload: http.edit_original_response(1, "limited", payload), window=0.05)
+    try:
+        # 10 schnelle Klicks; der erste Edit läuft in ein 429, weitere Klicks kommen während des Wartens
+        for page in range(10):
+            state["page"] = page
+            coalescer.request()
+            await asyncio.sleep(0.01)
+        await coalescer.flush()
+        # Bucket mit Remaining 0: der zweite Request wartet Reset-After ab statt ein 429 zu kassieren
+        await http.edit_original_response(1, "drained", {"page": 0})
+        await http.edit_original_response(1, "drained", {"page": 1})
+    finally:
+        coalescer.close()
+        await http.close()
+        await runner.cleanup()
+
+    limited = log.get("limited", [])
+    drained = log.get("drained", [])
+    backoff = limited[1][0] - limited[0][0] if len(limited) > 1 else 0.0
+    wait = drained[1][0] - drained[0][0] if len(drained) > 1 else 0.0
+    checks = [
+        ("10 Klicks angenommen", coalescer.requested == 10),
+        (f"zusammengefasst auf {coalescer.sent} Edits (≤ 3)", coalescer.sent <= 3),
+        ("ein Request pro Edit plus ein Retry", len(limited) == coalescer.sent + 1),
+        ("erster Edit bekommt 429", bool(limited) and limited[0][2] == 429),
+        ("Retry schickt dieselbe Seite", len(limited) > 1 and limited[1][1] == limited[0][1]),
+        (f"Retry nach {backoff:.2f} s (Retry-After 0.3)", backoff >= 0.29),
+        ("letzte Seite kommt an", bool(limited) and limited[-1][1] == 9),
+        ("genau ein 429 gezählt", http.rate_limited == 1),
+        ("leerer Bucket: beide Requests durch", len(drained) == 2),
+        (f"leerer Bucket: {wait:.2f} s gewartet (Reset-After 0.25)", wait >= 0.24),
+    ]
+    ok = all(passed for _, passed in checks)
+    for name, passed in checks:
+        print(f"  {'OK    ' if passed else 'FEHLER'} {name}")
+    print(f"Edit-Coalescer gegen lokalen Stand-in: {'OK' if ok else 'FEHLER'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit coalescer tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("selftest", help="click coalescing and 429/bucket backoff against a local stand-in")
+    parser.parse_args()
+    raise SystemExit(0 if asyncio.run(_selftest()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# leaderboard.py
+# Per-User Aggregate (Sammlungswert + Completion) und sortierte Ranglisten,
+# die bei jeder Mutation inkrementell nachgeführt werden.
+from bisect import bisect_left, insort
+
+from ownership import flags_to_indexes
+
+
+class RankedBoard:
+    """
+    Rangliste als sortierte Liste von (-score, user_id).
+    Rang und Position finden per Binärsuche (O(log n)), Top-K ist ein Slice.
+    """
+
+    def __init__(self):
+        self._entries: list[tuple[float, str]] = []
+        self._scores: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, user_id: str, score: float):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            pos = bisect_left(self._entries, (-old, user_id))
+            del self._entries[pos]
+        if score > 0:
+            self._scores[user_id] = score
+            insort(self._entries, (-score, user_id))
+        else:
+            # Leere Sammlungen tauchen im Ranking nicht auf
+            self._scores.pop(user_id, None)
+
+    def score(self, user_id: str) -> float:
+        return self._scores.get(user_id, 0)
+
+    def rank(self, user_id: str) -> int | None:
+        """1-basierter Rang oder None, wenn der User nicht gelistet ist."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        # Gleichstand → gleicher Rang (Anzahl strikt besserer Einträge + 1)
+        return bisect_left(self._entries, (-score, "")) + 1
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        return [(uid, -neg) for neg, uid in self._entries[:k]]
+
+
+class CollectionStats:
+    """
+    Aggregiert pro User:
+      - Sammlungswert (Summe `wert` über alle besessenen Item/Index-Paare),
+        gesamt, pro Rarity und pro Index
+      - Completion: Anzahl Items pro Index und Anzahl Items (mit mind. einem Index) pro Rarity
+    und hält für jede Sicht ein RankedBoard aktuell.
+    """
+
+    OVERALL = ("overall", None)
+
+    def __init__(self):
+        self.value: dict[str, dict[tuple, float]] = {}      # user → board-key → Wert
+        self.index_counts: dict[str, dict[str, int]] = {}   # user → index → Anzahl
+        self.rarity_counts: dict[str, dict[str, int]] = {}  # user → rarity → Anzahl Items
+        self.boards: dict[tuple, RankedBoard] = {}
+        self.built = False       # Aufbau läuft im Hintergrund (main.build_stats)
+        self.generation = 0      # zählt adopt() – Schreiber mit älterem Stand zählen neu statt Deltas
+
+    @staticmethod
+    def rarity_key(rarity: str) -> tuple:
+        return ("rarity", rarity)
+
+    @staticmethod
+    def index_key(index: str) -> tuple:
+        return ("index", index)
+
+    def board(self, key: tuple) -> RankedBoard:
+        return self.boards.setdefault(key, RankedBoard())
+
+    def rebuild(self, own_db: dict, items_by_id: dict):
+        """Komplett neu aufbauen (nur beim Start bzw. nach einem Katalog-Reload)."""
+        self.rebuild_from(own_db.items(), items_by_id)
+
+    def rebuild_from(self, users, items_by_id: dict):
+        """Wie rebuild(), aber über (user_id, items)-Paare – z.B. gestreamt im Worker-Thread."""
+        self.value.clear()
+        self.index_counts.clear()
+        self.rarity_counts.clear()
+        self.boards.clear()
+        for user_id, items in users:
+            self._count_user(user_id, items, items_by_id)
+            for key, score in self.value[user_id].items():
+                self.board(key).update(user_id, score)
+        self.built = True
+
+    def adopt(self, other: "CollectionStats"):
+        """Stand eines im Hintergrund gebauten Objekts übernehmen (Referenzen auf dieses bleiben gültig)."""
+        self.value = other.value
+        self.index_counts = other.index_counts
+        self.rarity_counts = other.rarity_counts
+        self.boards = other.boards
+        self.built = True
+        self.generation += 1
+
+    def refresh_user(self, user_id: str, items: dict, items_by_id: dict):
+        """Einen User komplett neu zählen (z.B. nach Änderungen durch einen anderen Bot-Prozess)."""
+        if not self.built:
+            return
+        old_keys = set(self.value.get(user_id, {}))
+        self._count_user(user_id, items, items_by_id)
+        values = self.value[user_id]
+        for key in old_keys | set(values):
+            self.board(key).update(user_id, values.get(key, 0))
+
+    def _count_user(self, user_id: str, items: dict, items_by_id: dict):
+        values = self.value[user_id] = {}
+        idx_counts = self.index_counts[user_id] = {}
+        rar_counts = self.rarity_counts[user_id] = {}
+        for item_id, flags in items.items():
+            data = items_by_id.get(item_id)
+            if not data or not flags:
+                continue
+            wert = data.get("wert", 0) or 0
+            rarity = data.get("rarity", "Unknown")
+            rar_counts[rarity] = rar_counts.get(rarity, 0) + 1
+            for idx in flags_to_indexes(flags):
+                idx_counts[idx] = idx_counts.get(idx, 0) + 1
+                for key in (self.OVERALL, self.rarity_key(rarity), self.index_key(idx)):
+                    values[key] = values.get(key, 0) + wert
+
+    def apply(self, user_id: str, data: dict, index: str, delta: int, item_count_delta: int = 0):
+        """
+        Eine Mutation einspielen.
+        delta: +1 (Index hinzugefügt) oder -1 (Index entfernt)
+        item_count_delta: +1/-1, wenn das Item dadurch neu besessen/komplett entfernt wurde
+        """
+        if not self.built:
+            return  # rebuild() liest später ohnehin den aktuellen Stand
+        wert = (data.get("wert", 0) or 0) * delta
+        rarity = data.get("rarity", "Unknown")
+        values = self.value.setdefault(user_id, {})
+        idx_counts = self.index_counts.setdefault(user_id, {})
+        idx_counts[index] = idx_counts.get(index, 0) + delta
+        if item_count_delta:
+            rar_counts = self.rarity_counts.setdefault(user_id, {})
+            rar_counts[rarity] = rar_counts.get(rarity, 0) + item_count_delta
+        for key in (self.OVERALL, self.rarity_key(rarity), self.index_key(index)):
+            values[key] = values.get(key, 0) + wert
+            self.board(key).update(user_id, values[key])
+
+    def user_value(self, user_id: str, key: tuple = OVERALL) -> float:
+        return self.value.get(user_id, {}).get(key, 0)
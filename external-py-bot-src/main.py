@@ -3,7 +3,6 @@ from operator import index
 import os
 import json
 import asyncio
-import requests
 
 from typing import List
 from pathlib import Path
@@ -13,6 +12,20 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from leaderboard import CollectionStats
+from edit_coalescer import EditCoalescer, RateLimitedHTTP
+from ownership import OWN_INDEXES, INDEX_BITS, ItemIds, OwnershipVersions, flags_to_indexes, load_ownership
+from ownership_snapshot import SnapshotOwnership, iter_frozen, write_snapshot
+from ownership_store import OwnershipStore, SharedOwnership
+from ownership_service import OwnershipService
+from web_sync import WebSync
+from missing_cache import MissingCache
+from view_registry import ViewRegistry
+from paginator import page_at, page_before, write_csv
+from catalog_query import RARITY_ORDER, SORTS, CatalogColumns, CatalogQuery, item_types
+from catalog_refresh import CatalogDiff, CatalogRefresher, diff_catalog, validate_catalog
+from command_sync import CommandSyncState, parse_targets, sync_if_changed
+
 env_path = Path(__file__).parent / '.env'
 
 # Lädt die Datei explizit mit absolutem Pfad
@@ -23,8 +36,26 @@ if not TOKEN:
     raise SystemExit("Please set DISCORD_TOKEN in environment (e.g. .env)")
 
 DB_FILE = "brainrot_db.json"
-OWN_FILE = "ownership.json"
+OWN_FILE = "ownership.json"        # nur noch Import-Quelle (bzw. via ownership_snapshot.py to-json)
+OWN_SNAPSHOT = "ownership.bin"     # binärer Snapshot, wird beim Start gemappt
+SNAPSHOT_DELAY = 2.0               # Sekunden – Mutationen innerhalb dieses Fensters landen in einem Snapshot
+OWN_STORE = os.getenv("OWN_STORE")  # SQLite-Datei (WAL) → gemeinsamer Store für mehrere Bot-Prozesse / Shards
+STORE_POLL_INTERVAL = float(os.getenv("STORE_POLL_INTERVAL", "1"))  # Sekunden zwischen Cache-Invalidierungs-Polls
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))  # >0 → AutoShardedBot
+SHARD_IDS = [int(x) for x in os.getenv("SHARD_IDS", "").split(",") if x.strip()] or None  # Shards dieses Prozesses
+WEB_SYNC_DB = os.getenv("WEB_SYNC_DB")  # Pfad zur brainrot.db der Web-App; leer = kein Sync (sharded: nur in einem Prozess setzen)
+WEB_SYNC_INTERVAL = float(os.getenv("WEB_SYNC_INTERVAL", "30"))
 MAX_SUGGEST = 25  # Discord erlaubt bis 25 choices
+EDIT_COALESCE_WINDOW = float(os.getenv("EDIT_COALESCE_WINDOW", "0.4"))  # Sekunden, in denen Klicks zu einem Edit verschmelzen
+CATALOG_URL = os.getenv("CATALOG_URL")  # Quelle für Katalog-Updates (gleiches Format wie brainrot_db.json); leer = nur lokale Datei
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "3600"))
+CATALOG_STATE = "catalog_state.json"  # ETag/Last-Modified + Ergebnisse der Bild-Prüfung
+THUMBNAIL_CHECK_CONCURRENCY = int(os.getenv("THUMBNAIL_CHECK_CONCURRENCY", "8"))
+CATALOG_OWNER = not SHARD_IDS or 0 in SHARD_IDS  # Sharded: nur der Prozess mit Shard 0 holt/schreibt den Katalog
+CATALOG_RELOAD_INTERVAL = 60.0                   # Sekunden – die anderen Prozesse prüfen, ob sich die Dateien geändert haben
+SYNC_TARGETS = parse_targets(os.getenv("SYNC_GUILDS", ""))  # Guild-ids und/oder "global", komma-getrennt; leer = global
+SYNC_FORCE = os.getenv("SYNC_FORCE") == "1"                 # Hash ignorieren und trotzdem syncen
+COMMAND_SYNC_STATE = "command_sync.json"                     # zuletzt gesyncte Tree-Hashes pro Ziel
 
 
 # helper: safe load/save json
@@ -38,34 +69,158 @@ def load_json(path: str, default):
             return default
 
 def save_json(path: str, data):
-    with open(path, "w", encoding="utf-8") as f:
+    # Atomar (tmp + replace): andere Bot-Prozesse lesen die Datei evtl. gerade neu ein
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
 # load DB at startup (you can add hot-reload later)
 ITEM_DB = load_json(DB_FILE, {})
-OWN_DB = load_json(OWN_FILE, {})
-
-# Allowed ownership indexes
-OWN_INDEXES = ["Normal", "Gold", "Diamond", "Candy", "Rainbow", "Galaxy", "YinYang", "Radioactive"]
-
-for user_id, items in OWN_DB.items():
-    if not isinstance(items, dict):
-        OWN_DB[user_id] = {}
-        continue
-    for item_name, value in list(items.items()):
-        if not isinstance(value, list):
-            # Alte Daten (String, None, etc.) → in Liste umwandeln oder löschen
-            if isinstance(value, str) and value in OWN_INDEXES:
-                items[item_name] = [value]   # alten String in Liste packen
-            else:
-                items[item_name] = []        # alles andere weg
-
-print("cleaned up ownership-db und repariert")
+ITEM_IDS = ItemIds(ITEM_DB)  # Name ↔ id, Besitz wird nur über die id geführt
+REFRESHER = CatalogRefresher(CATALOG_URL, CATALOG_STATE, concurrency=THUMBNAIL_CHECK_CONCURRENCY)
+
+# { user_id: { item_id: flags } } – User werden erst beim ersten Zugriff geladen/dekodiert
+if OWN_STORE:
+    # Sharded-Betrieb: alle Prozesse teilen sich einen Store, jede Mutation ist eine Transaktion
+    OWN_DB = SharedOwnership(OwnershipStore(OWN_STORE))
+    if not OWN_DB.store.imported:
+        # Bisherigen Besitz (Snapshot bzw. JSON) genau einmal übernehmen
+        legacy = SnapshotOwnership(OWN_SNAPSHOT) if os.path.exists(OWN_SNAPSHOT) else load_ownership(OWN_FILE, ITEM_IDS)
+        if OWN_DB.store.import_once(legacy):
+            print(f"[STORE] {len(legacy)} Besitzer nach {OWN_STORE} übernommen")
+elif os.path.exists(OWN_SNAPSHOT):
+    OWN_DB = SnapshotOwnership(OWN_SNAPSHOT)
+else:
+    # Erster Start bzw. Umstieg: JSON (inkl. Migration alter name-keyed Dateien) einlesen
+    OWN_DB = SnapshotOwnership()
+    OWN_DB.update(load_ownership(OWN_FILE, ITEM_IDS))
+    write_snapshot(OWN_SNAPSHOT, OWN_DB.snapshot_blobs())
+    if os.name != "nt":
+        OWN_DB.remap(OWN_SNAPSHOT)
+
+_snapshot_dirty = False
+_snapshot_task: asyncio.Task | None = None
+
+def save_own():
+    """Snapshot im Hintergrund anstoßen; Saves kurz hintereinander werden zusammengefasst."""
+    global _snapshot_dirty, _snapshot_task
+    if OWN_STORE:
+        return  # der gemeinsame Store hat jede Mutation schon geschrieben
+    _snapshot_dirty = True
+    if _snapshot_task is None or _snapshot_task.done():
+        _snapshot_task = asyncio.create_task(_snapshot_loop())
+
+async def _snapshot_loop():
+    global _snapshot_dirty
+    while _snapshot_dirty:
+        await asyncio.sleep(SNAPSHOT_DELAY)
+        _snapshot_dirty = False
+        try:
+            await flush_own()
+        except Exception as e:
+            print(f"[SNAPSHOT ERROR] {e}")
+
+async def flush_own():
+    if OWN_STORE:
+        return
+    # Plan auf dem Event-Loop (konsistenter Stand, kopiert nur geänderte User);
+    # Kodieren, rohes Kopieren und Schreiben im Worker-Thread
+    if os.name == "nt":
+        OWN_DB.release_map()  # Windows kann eine gemappte Datei nicht ersetzen
+    plan = OWN_DB.snapshot_plan()
+    pending = VERSIONS.pending | _web_sync_users if WEB_SYNC else set()
+    await asyncio.to_thread(_write_own_snapshot, plan, pending)
+    if os.name != "nt":
+        OWN_DB.remap(OWN_SNAPSHOT)  # ab jetzt gelten die geschriebenen User wieder als unverändert
+
+def _write_own_snapshot(plan: list, pending: set[str]):
+    if pending:
+        WEB_SYNC.mark_pending(pending)  # vor dem Snapshot: nach einem Absturz lieber einer zu viel
+    write_snapshot(OWN_SNAPSHOT, OWN_DB.snapshot_blobs(plan))
+
+async def close_own():
+    """
+    Beim Beenden: einen laufenden Snapshot erst abwarten – ein abgebrochener Task stoppt
+    den Worker-Thread nicht, und zwei Threads würden dieselbe .tmp-Datei schreiben.
+    """
+    global _snapshot_dirty
+    if _snapshot_task is not None and not _snapshot_task.done():
+        _snapshot_dirty = False  # Schleife endet nach dem aktuellen Durchlauf
+        await _snapshot_task
+    await flush_own()
 
 # sort list one time for fast auto complete
 ITEM_NAMES = sorted(ITEM_DB.keys(), key=lambda x: x.lower()) if ITEM_DB else []
 print(f"Geladen: {len(ITEM_DB)} Items, {len(OWN_DB)} Besitzer")
 
+# Versionszähler pro User (Cache-Invalidierung, Web-Sync)
+VERSIONS = OwnershipVersions()
+
+# Sammlungswert + Completion pro User – im Hintergrund aufgebaut (build_stats), danach inkrementell
+STATS = CollectionStats()
+
+# Einziger Schreibpfad: OWN_DB + STATS + VERSIONS (+ Änderungen anderer Prozesse übernehmen)
+OWNERSHIP = OwnershipService(OWN_DB, STATS, VERSIONS, ITEM_IDS.by_id)
+
+
+# ───── Leaderboard-Aggregate: Aufbau im Worker-Thread ─────
+_stats_task: asyncio.Task | None = None
+
+def build_stats() -> asyncio.Task:
+    """Startet den Aufbau, falls nötig, und liefert den Task (Leaderboard wartet darauf)."""
+    global _stats_task
+    if _stats_task is None or (_stats_task.done() and not STATS.built):
+        _stats_task = asyncio.create_task(_build_stats())
+    return _stats_task
+
+def _collect_stats(source, items_by_id: dict) -> CollectionStats:
+    users = source.iter_users() if isinstance(source, OwnershipStore) else iter_frozen(source)
+    stats = CollectionStats()
+    stats.rebuild_from(users, items_by_id)
+    return stats
+
+async def _build_stats():
+    """
+    Zählt einen Abzug des Besitzes im Worker-Thread durch. User, die sich währenddessen ändern,
+    werden danach auf dem Loop einzeln nachgezählt; ein Katalogwechsel startet den Aufbau neu.
+    """
+    while not STATS.built:
+        catalog = ITEM_IDS
+        touched = set()
+        VERSIONS.listeners.append(touched.add)
+        try:
+            source = OWN_DB.store if OWN_STORE else OWN_DB.frozen()
+            fresh = await asyncio.to_thread(_collect_stats, source, catalog.by_id)
+        except Exception as e:
+            print(f"[STATS ERROR] {e}")
+            return
+        finally:
+            VERSIONS.listeners.remove(touched.add)
+        if ITEM_IDS is not catalog:
+            continue
+        STATS.adopt(fresh)
+        for user_id in touched:
+            STATS.refresh_user(user_id, OWN_DB.get(user_id, {}), ITEM_IDS.by_id)
+        print(f"[STATS] {len(STATS.value)} Sammlungen gezählt")
+
+
+# ───── Besitz-Mutationen (einziger Schreibpfad → Aggregate & Ranglisten bleiben aktuell) ─────
+def has_index(owns: dict, item_id: int, index: str) -> bool:
+    return bool(owns.get(item_id, 0) & INDEX_BITS[index])
+
+async def own_add(user_id: str, item_id: int, index: str) -> bool:
+    """Setzt das Bit für `index`. False, wenn der User ihn schon hatte."""
+    bit = INDEX_BITS[index]
+    old, = await OWNERSHIP.update(user_id, [(item_id, bit, 0)])
+    return not old & bit
+
+async def own_remove(user_id: str, item_id: int, index: str) -> bool:
+    """Löscht das Bit für `index`; leere Einträge fliegen raus. False, wenn nicht vorhanden."""
+    bit = INDEX_BITS[index]
+    old, = await OWNERSHIP.update(user_id, [(item_id, 0, bit)])
+    return bool(old & bit)
+
 def format_number(num) -> str:
     if not num or not isinstance(num, (int, float)):
         return "—"
@@ -81,17 +236,219 @@ def format_number(num) -> str:
     else:
         return str(int(num))
 
-# ───── Stattdessen: Super einfache & sichere Thumbnail-Logik ─────
+# ───── Thumbnail nur, wenn die URL nicht als kaputt bekannt ist ─────
 def set_thumbnail_if_valid(embed: discord.Embed, url: str | None):
     """
-    Setzt das Thumbnail nur, wenn eine gültige URL vorhanden ist.
-    Discord ignoriert automatisch kaputte Links → kein Crash, kein leeres Bild.
+    Geprüft wird gesammelt im Hintergrund (REFRESHER.check_images) – hier nur ein
+    Cache-Lookup. Noch ungeprüfte http(s)-URLs werden gesetzt; Discord ignoriert kaputte.
     """
-    if url and isinstance(url, str) and url.strip():
-        # Optional: ganz kleine Absicherung gegen offensichtlichen Müll
-        if url.startswith(("http://", "https://")):
-            embed.set_thumbnail(url=url.strip())
-        # Wenn's kein http(s) ist → ignorieren
+    if not url or not isinstance(url, str):
+        return
+    url = url.strip()
+    if url.startswith(("http://", "https://")) and REFRESHER.image_ok(url) is not False:
+        embed.set_thumbnail(url=url)
+
+# ───── Fehlende Items pro (User, Index) – gecacht, Mutationen invalidieren nur den User ─────
+MISSING_CACHE = MissingCache(int(os.getenv("MISSING_CACHE_SIZE", "512")))
+VERSIONS.listeners.append(MISSING_CACHE.invalidate_user)
+
+def compute_missing(user_id: str, index: str) -> list[tuple[int, str]]:
+    """Alle Items, die der User noch NICHT als diesen Index hat – nach Rarity, dann Wert sortiert."""
+    owns = OWN_DB.get(user_id, {})
+    bit = INDEX_BITS[index]
+    missing_pets = []
+    for data in ITEM_DB.values():
+        if index == "Candy" and "Candy" not in data.get("fixed_sets", []):
+            continue  # Überspringe Items, die nicht zum Candy-Set gehören
+        if not owns.get(data["id"], 0) & bit:
+            missing_pets.append(data)
+
+    def sort_key(data):
+        rarity = data.get("rarity", "Common")
+        # Unbekannte Rarities hinten, aber je Rarity zusammenhängend (für die Rarity-Slices im Cache)
+        rank = RARITY_ORDER.index(rarity) if rarity in RARITY_ORDER else 99
+        return rank, rarity if rank == 99 else "", data.get("wert", 0)
+
+    missing_pets.sort(key=sort_key)
+    return [(data["id"], data.get("rarity", "")) for data in missing_pets]
+
+def get_missing(user_id: str, index: str):
+    return MISSING_CACHE.get(user_id, index, VERSIONS.version(user_id), ITEM_IDS.version,
+                             lambda: compute_missing(user_id, index))
+
+def editor_items(index: str) -> list[int]:
+    """Editor-Reihenfolge eines Index: nur gültige Items (Candy: Candy-Set), nach Rarity, dann Wert."""
+    items = [data for data in ITEM_IDS.by_id.values()
+             if index != "Candy" or "Candy" in data.get("fixed_sets", [])]
+
+    def sort_key(data):
+        rarity = data.get("rarity", "Common")
+        return (RARITY_ORDER.index(rarity) if rarity in RARITY_ORDER else 99), data.get("wert", 0)
+
+    items.sort(key=sort_key)
+    return [data["id"] for data in items]
+
+
+# ───── Katalog-Abfragen: Spalten-Masken + Plan-Cache (search, massadd/massremove, type) ─────
+CATALOG = CatalogQuery(CatalogColumns(ITEM_IDS.by_id, ITEM_IDS.id_to_name, ITEM_IDS.version))
+
+def query_items(**filters) -> list[int]:
+    """Item-ids für statische Filter (ohne Besitz), siehe CatalogQuery.compile."""
+    return CATALOG.run(CATALOG.compile(**filters))
+
+
+# ───── Live-Views (Editor): geteilte Item-Sequenzen, Obergrenzen pro User und global ─────
+VIEWS = ViewRegistry(
+    max_per_user=int(os.getenv("VIEW_MAX_PER_USER", "3")),
+    max_total=int(os.getenv("VIEW_MAX_TOTAL", "500")),
+    ttl=float(os.getenv("VIEW_TTL", "840")),  # < 15 min – so lange bleibt der Interaction-Token gültig
+)
+
+
+# ───── Web-Sync (userdata-Tabelle der Web-App, nur Änderungen) ─────
+WEB_SYNC = WebSync(WEB_SYNC_DB, ITEM_IDS) if WEB_SYNC_DB else None
+
+_web_sync_resumed = False
+_web_sync_users: set[str] = set()  # gerade im Abgleich – werden beim Snapshot mit vorgemerkt
+
+async def _resumed_users() -> set[str]:
+    """
+    Nach einem Neustart ist `pending` leer: vorgemerkte User laden (Snapshot-Betrieb) bzw.
+    alles seit der letzten Changelog-Marke (Store). Nur wenn beides fehlt, alle User vergleichen.
+    """
+    if OWN_STORE:
+        since = WEB_SYNC.store_seq
+        users = await asyncio.to_thread(OWN_DB.store.changed_users, since) if since is not None else None
+    else:
+        users = await asyncio.to_thread(WEB_SYNC.load_pending)
+    if users is not None:
+        return users
+    print("[WEB SYNC] Keine Vormerkungen gefunden – einmaliger Vergleich aller User")
+    bases = await asyncio.to_thread(WEB_SYNC.load_bases)
+    return {uid for uid in set(OWN_DB) | set(bases) if dict(OWN_DB.get(uid, {})) != bases.get(uid, {})}
+
+async def web_sync_once():
+    global _web_sync_resumed, _web_sync_users
+    # Im Store-Betrieb: alles bis zu dieser Marke ist nach der Runde abgeglichen (Polls haben es in `pending` gebracht)
+    store_seq = OWN_DB.seq if OWN_STORE else None
+    # Erster Lauf: kompletter Abgleich, danach nur noch geänderte User
+    if not WEB_SYNC.initialized:
+        users = set(OWN_DB)
+    else:
+        users = set(VERSIONS.pending)
+        if not _web_sync_resumed:
+            users |= await _resumed_users()
+    _web_sync_resumed = True
+    VERSIONS.pending.difference_update(users)
+    _web_sync_users = users
+    try:
+        fetched = await asyncio.to_thread(WEB_SYNC.fetch, users)
+        plan = WEB_SYNC.merge(fetched, OWN_DB)
+        for uid, p in plan["users"].items():
+            # Nur das Delta gegenüber dem gemergten lokalen Stand – keine absoluten Flags: der Cache
+            # kann veraltet sein, und Klicks/andere Shards zwischen merge() und Schreiben bleiben erhalten
+            local, merged = p["local"], p["merged"]
+            changes = [(item_id, merged.get(item_id, 0) & ~local.get(item_id, 0), local.get(item_id, 0) & ~merged.get(item_id, 0))
+                       for item_id in local.keys() | merged.keys() if local.get(item_id, 0) != merged.get(item_id, 0)]
+            before = VERSIONS.version(uid)
+            olds = await OWNERSHIP.update(uid, changes) if changes else []
+            ours = any((old | set_bits) & ~clear_bits != old for (_, set_bits, clear_bits), old in zip(changes, olds))
+            if VERSIONS.version(uid) == before + ours:
+                VERSIONS.pending.discard(uid)  # lokaler Stand = Merge, wird gleich geschrieben
+        plan["store_seq"] = store_seq
+        written, conflicts = await asyncio.to_thread(WEB_SYNC.commit, plan)
+    except Exception:
+        VERSIONS.pending.update(users)
+        raise
+    finally:
+        _web_sync_users = set()
+    if plan["users"]:
+        save_own()
+        print(f"[WEB SYNC] {len(plan['users'])} User abgeglichen, {written} geschrieben, {len(conflicts)} Konflikte auf die nächste Runde vertagt")
+
+async def web_sync_loop():
+    while True:
+        try:
+            await web_sync_once()
+        except Exception as e:
+            print(f"[WEB SYNC ERROR] {e}")
+        await asyncio.sleep(WEB_SYNC_INTERVAL)
+
+# ───── Katalog-Refresh: bedingt laden, als Diff übernehmen, Bild-URLs prüfen ─────
+def apply_catalog(new_db: dict) -> CatalogDiff:
+    """Übernimmt einen neuen Katalog in ITEM_DB; abgeleitete Strukturen bekommen eine neue Katalog-Version."""
+    global ITEM_IDS, ITEM_NAMES, CATALOG
+    diff = diff_catalog(ITEM_DB, new_db)
+    if not diff:
+        return diff
+    for name in diff.removed:
+        del ITEM_DB[name]
+    for name in diff.added + diff.changed:
+        ITEM_DB[name] = new_db[name]
+
+    ITEM_IDS = ItemIds(ITEM_DB, version=ITEM_IDS.version + 1)  # MISSING_CACHE/VIEWS.sequences hängen an der Version
+    ITEM_NAMES = sorted(ITEM_DB.keys(), key=lambda x: x.lower())
+    CATALOG = CatalogQuery(CatalogColumns(ITEM_IDS.by_id, ITEM_IDS.id_to_name, ITEM_IDS.version))
+    MISSING_CACHE.clear()
+    if WEB_SYNC:
+        WEB_SYNC.ids = ITEM_IDS
+    OWNERSHIP.items_by_id = ITEM_IDS.by_id
+    STATS.built = False  # Rarity/Wert können sich geändert haben → im Hintergrund neu aufbauen
+    build_stats()
+    return diff
+
+async def refresh_catalog_once():
+    if REFRESHER.url:
+        new_db = await REFRESHER.fetch()
+        if new_db is not None:
+            diff = apply_catalog(new_db)
+            await asyncio.to_thread(save_json, DB_FILE, new_db)
+            REFRESHER.commit()
+            print(f"[CATALOG] {diff} → Version {ITEM_IDS.version}")
+    checked, bad = await REFRESHER.check_images(data.get("image") for data in ITEM_DB.values())
+    if checked:
+        print(f"[THUMBNAILS] {checked} URLs geprüft, {len(bad)} nicht erreichbar")
+
+_catalog_mtimes: dict[str, float] = {}
+
+def _changed_since_last_check(path: str) -> bool:
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    changed = path in _catalog_mtimes and _catalog_mtimes[path] != mtime
+    _catalog_mtimes[path] = mtime
+    return changed
+
+async def reload_catalog_once():
+    """Nicht-Besitzer-Prozesse: Katalog und Bild-Cache übernehmen, wenn Shard 0 sie neu geschrieben hat."""
+    if _changed_since_last_check(DB_FILE):
+        try:
+            new_db = await asyncio.to_thread(lambda: validate_catalog(load_json(DB_FILE, None)))
+        except ValueError as e:
+            print(f"[CATALOG] {DB_FILE} nicht übernommen: {e}")
+        else:
+            diff = apply_catalog(new_db)
+            print(f"[CATALOG] {diff} aus {DB_FILE} → Version {ITEM_IDS.version}")
+    if _changed_since_last_check(CATALOG_STATE):
+        await asyncio.to_thread(REFRESHER.reload_state)
+
+async def catalog_refresh_loop():
+    if not CATALOG_OWNER:
+        _changed_since_last_check(DB_FILE)  # Stand beim Start merken
+        _changed_since_last_check(CATALOG_STATE)
+        while True:
+            await asyncio.sleep(CATALOG_RELOAD_INTERVAL)
+            try:
+                await reload_catalog_once()
+            except Exception as e:
+                print(f"[CATALOG ERROR] {e}")
+    while True:
+        try:
+            await refresh_catalog_once()
+        except Exception as e:
+            print(f"[CATALOG ERROR] {e}")
+        await asyncio.sleep(CATALOG_REFRESH_INTERVAL)
 
 # ───── Autocomplete (stabil & schnell) ─────
 async def item_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -138,6 +495,15 @@ async def type_autocomplete(interaction: discord.Interaction, current: str) -> L
     matches.sort()
     return [app_commands.Choice(name=t, value=t) for t in matches[:25]]
 
+# ───── Autocomplete für Sets ─────
+async def set_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    sets = set()
+    for data in ITEM_DB.values():
+        sets.update(data.get("fixed_sets") or [])
+    matches = [s for s in sets if current.lower() in s.lower()]
+    matches.sort()
+    return [app_commands.Choice(name=s, value=s) for s in matches[:25]]
+
 #  🐨 🟡 💎 🌈 ☢️ 🧪  🌑 ☯︎ 
 
 INDEX_EMOJIS = {
@@ -163,7 +529,16 @@ RARITY_EMOJIS = {
 }
 
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
+if SHARD_COUNT:
+    # Mehrere Prozesse: jeder übernimmt SHARD_IDS von SHARD_COUNT, Besitz liegt in OWN_STORE
+    if not OWN_STORE:
+        raise SystemExit("Sharded mode needs OWN_STORE (shared ownership database)")
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
+
+# Gemeinsamer, rate-limit-bewusster Client für gebündelte Editor-Edits
+EDIT_HTTP = RateLimitedHTTP(api_base=os.getenv("DISCORD_API_BASE", "https://discord.com/api/v10"))
 
 
 def format_index_with_emoji(index: str) -> str:
@@ -197,16 +572,13 @@ class Brainrot(commands.Cog):
         embed.add_field(name="Income/s", value=format_number(data.get("wert")), inline=True)
         embed.add_field(name="Cost", value=format_number(data.get("kosten")), inline=True)
 
-        if img := data.get("image"):
-            if img.startswith(("http://", "https://")):
-                embed.set_thumbnail(url=img)
+        set_thumbnail_if_valid(embed, data.get("image"))
 
         # Besitz anzeigen
-        owned = OWN_DB.get(str(interaction.user.id), {}).get(item, [])
+        owned = flags_to_indexes(OWN_DB.get(str(interaction.user.id), {}).get(data["id"], 0))
         if owned:
-            # Coolste zuerst sortieren
-            order = ["Normal", "Gold", "Diamond", "Candy", "Rainbow", "Galaxy", "YinYang", "Radioactive"]
-            owned_sorted = sorted(owned, key=lambda x: order.index(x) if x in order else 999)
+            # Coolste zuerst – flags_to_indexes liefert schon OWN_INDEXES-Reihenfolge
+            owned_sorted = owned
 
             colored_indexes = [format_index_with_emoji(idx) for idx in owned_sorted]
 
@@ -230,54 +602,15 @@ class Brainrot(commands.Cog):
         await interaction.response.defer(ephemeral=is_ephemeral)
 
         # Suche Items, die den Type in ihrer Liste haben
-        items_of_type = []
-        for name, data in ITEM_DB.items():
-            types = data.get("type", [])
-            if isinstance(types, str):
-                types = [x.strip() for x in types.split(",") if x.strip()]
-            if type.lower() in [t.lower() for t in types]:
-                items_of_type.append((name, data))
-
-        if not items_of_type:
+        source = type_source(type)
+        if not source.items:
             # Wichtig: followup muss auch wissen, ob es privat sein soll
             await interaction.followup.send(f"No brainrots found with type **{type}**.", ephemeral=is_ephemeral)
             return
 
-        # Sortierung & Formatierung (unverändert)
-        items_of_type.sort(key=lambda x: x[1].get("wert", 0), reverse=True)
-
-        limit = 30 # Hinweis: Discord Embeds haben Zeichenlimits, bei 70 Items wird es oft zu lang
-        total = len(items_of_type)
-        lines = []
-
-        for i, (name, data) in enumerate(items_of_type[:limit], 1):
-            wert = format_number(data.get("wert", 0))
-            rarity = data.get("rarity", "❔")
-            emoji = RARITY_EMOJIS.get(rarity, "❔")
-            
-            item_types = data.get("type", [])
-            if isinstance(item_types, str):
-                item_types = [x.strip() for x in item_types.split(",")]
-            types_str = ", ".join(item_types)
-            lines.append(f"`{i:2}.` {emoji} **{name}** • {wert} • _{types_str}_")
-
-        if total > limit:
-            lines.append(f"\n... and **{total - limit} more**")
-
-        embed = discord.Embed(
-            title=f"{type.capitalize()} Brainrots",
-            description="\n".join(lines),
-            color=0x3498db
-        )
-        embed.set_footer(text=f"Total: {total} • Sorted by value")
-
-        if items_of_type:
-            top_img = items_of_type[0][1].get("image")
-            if top_img and top_img.startswith(("http://", "https://")):
-                embed.set_thumbnail(url=top_img)
-
+        embed, view = render_list_page("t", type, source, 0)
         # Finales Senden - nutzt den Status von is_ephemeral
-        await interaction.followup.send(embed=embed, ephemeral=is_ephemeral)
+        await interaction.followup.send(embed=embed, view=view, ephemeral=is_ephemeral)
 
 
     # ───── add ─────
@@ -286,7 +619,8 @@ class Brainrot(commands.Cog):
     @app_commands.autocomplete(item=item_autocomplete)
     @app_commands.autocomplete(index=index_autocomplete)
     async def add(self, interaction: discord.Interaction, item: str, index: str):
-        if item not in ITEM_DB:
+        item_id = ITEM_IDS.id(item)  # None auch für Katalog-Einträge ohne gültige id (ItemIds überspringt sie)
+        if item_id is None:
             await interaction.response.send_message("Item does not exist.", ephemeral=True)
             return
         if index not in OWN_INDEXES:
@@ -296,19 +630,12 @@ class Brainrot(commands.Cog):
             return
         
         user_id = str(interaction.user.id)
-        user_items = OWN_DB.setdefault(user_id, {})
-
-        if item not in user_items or not isinstance(user_items[item], list):
-            user_items[item] = []
-
-        current = user_items[item]
 
-        if index in current:
+        if not await own_add(user_id, item_id, index):
             await interaction.response.send_message(f"You already have **{item}** in your **{index}**!", ephemeral=True)
             return
 
-        current.append(index)
-        save_json(OWN_FILE, OWN_DB)
+        save_own()
         await interaction.response.send_message(f"**Added {item}** to **{index}**!", ephemeral=True)
 
     # ───── MASSE ADD (z.B. alle Common als Gold) ─────
@@ -323,26 +650,20 @@ class Brainrot(commands.Cog):
             return
 
         # Zähle, wie viele Items der Rarity existieren
-        items_of_rarity = [name for name, data in ITEM_DB.items() if data.get("rarity") == rarity]
+        items_of_rarity = query_items(rarity=rarity)
         if not items_of_rarity:
             await interaction.response.send_message(f"No items found with rarity **{rarity}**.", ephemeral=True)
             return
 
         user_id = str(interaction.user.id)
-        user_items = OWN_DB.setdefault(user_id, {})
 
-        added = 0
-        already_had = 0
+        # Eine Sammeländerung statt einer Transaktion pro Item
+        bit = INDEX_BITS[index]
+        olds = await OWNERSHIP.update(user_id, [(item_id, bit, 0) for item_id in items_of_rarity])
+        already_had = sum(1 for old in olds if old & bit)
+        added = len(olds) - already_had
 
-        for item_name in items_of_rarity:
-            current = user_items.setdefault(item_name, [])
-            if index not in current:
-                current.append(index)
-                added += 1
-            else:
-                already_had += 1
-
-        save_json(OWN_FILE, OWN_DB)
+        save_own()
 
         await interaction.response.send_message(
             f"**mass add successful!**\n"
@@ -367,10 +688,7 @@ class Brainrot(commands.Cog):
             return
 
         # Alle Items der Rarity finden (case-insensitive)
-        items_of_rarity = [
-            name for name, data in ITEM_DB.items()
-            if data.get("rarity", "").lower() == rarity.lower()
-        ]
+        items_of_rarity = query_items(rarity=rarity)
 
         if not items_of_rarity:
             await interaction.response.send_message(
@@ -380,24 +698,14 @@ class Brainrot(commands.Cog):
             return
 
         user_id = str(interaction.user.id)
-        user_items = OWN_DB.setdefault(user_id, {})
 
-        removed = 0
-        not_had = 0
+        # Eine Sammeländerung; Items ohne verbleibenden Index fliegen komplett raus (sauberer DB)
+        bit = INDEX_BITS[index]
+        olds = await OWNERSHIP.update(user_id, [(item_id, 0, bit) for item_id in items_of_rarity])
+        removed = sum(1 for old in olds if old & bit)
+        not_had = len(olds) - removed
 
-        for item_name in items_of_rarity:
-            current_indexes = user_items.get(item_name, [])
-            if index in current_indexes:
-                current_indexes.remove(index)
-                removed += 1
-
-                # Wenn das Item jetzt keinen Index mehr hat → komplett entfernen (sauberer DB)
-                if not current_indexes:
-                    del user_items[item_name]
-            else:
-                not_had += 1
-
-        save_json(OWN_FILE, OWN_DB)
+        save_own()
 
         await interaction.response.send_message(
             f"**Mass remove successful!**\n"
@@ -412,12 +720,13 @@ class Brainrot(commands.Cog):
     @app_commands.autocomplete(item=item_autocomplete)
     async def remove(self, interaction: discord.Interaction, item: str):
         user_id = str(interaction.user.id)
-        owned = OWN_DB.get(user_id, {}).get(item, [])
+        item_id = ITEM_IDS.id(item)
+        owned = flags_to_indexes(OWN_DB.get(user_id, {}).get(item_id, 0))
         if not owned:
             await interaction.response.send_message(f"You don't have **{item}**.", ephemeral=True)
             return
 
-        view = RemoveView(item, owned, user_id)
+        view = RemoveView(item_id, owned)
         await interaction.response.send_message(
             f"Remove which mutation of **{item}** ?",
             view=view,
@@ -440,10 +749,10 @@ class Brainrot(commands.Cog):
             totals.setdefault(r, 0)
             totals[r] += 1
 
-            if name in owns:
+            if flags := owns.get(data["id"]):
                 stats.setdefault(r, {}).setdefault("total", 0)
                 stats[r]["total"] += 1
-                for idx in owns[name]:
+                for idx in flags_to_indexes(flags):
                     stats[r].setdefault(idx, 0)
                     stats[r][idx] += 1
 
@@ -489,7 +798,7 @@ class Brainrot(commands.Cog):
         for name, data in ITEM_DB.items():
             rarity = data.get("rarity", "Unknown")
             totals[rarity] = totals.get(rarity, 0) + 1
-            if name in owns and index in owns[name]:
+            if has_index(owns, data["id"], index):
                 counts[rarity] = counts.get(rarity, 0) + 1
 
         if not any(counts.values()):
@@ -531,6 +840,81 @@ class Brainrot(commands.Cog):
         embed.set_footer(text=f"{total_owned}/{total_possible} possible • Brainrot forever")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    # ───── LEADERBOARD – Sammlungswert aller User (gesamt, pro Rarity, pro Index) ─────
+    @group.command(name="leaderboard", description="Rank collectors by total collection value")
+    @app_commands.describe(
+        rarity="Optional: only count items of this rarity",
+        index="Optional: only count this index (Gold, Diamond, ...)",
+        top="How many places to show (default 10)"
+    )
+    @app_commands.autocomplete(rarity=rarity_autocomplete)
+    @app_commands.autocomplete(index=index_autocomplete)
+    async def leaderboard(self, interaction: discord.Interaction, rarity: str = '', index: str = '', top: int = 10):
+        if rarity and index:
+            await interaction.response.send_message("Choose either a rarity **or** an index, not both.", ephemeral=True)
+            return
+        if index and index not in OWN_INDEXES:
+            await interaction.response.send_message(
+                f"Invalid index! Possible indexes: {', '.join(OWN_INDEXES)}", ephemeral=True
+            )
+            return
+
+        if rarity:
+            # Aggregate sind nach der Katalog-Schreibweise geschlüsselt ("secret" → "Secret")
+            spellings = {r.lower(): r for r in (data.get("rarity") for data in ITEM_DB.values()) if r}
+            if rarity.strip().lower() not in spellings:
+                await interaction.response.send_message(f"No items found with rarity **{rarity}**.", ephemeral=True)
+                return
+            rarity = spellings[rarity.strip().lower()]
+            key = CollectionStats.rarity_key(rarity)
+            scope = f"{RARITY_EMOJIS.get(rarity, '❔')} {rarity}"
+        elif index:
+            key = CollectionStats.index_key(index)
+            scope = format_index_with_emoji(index)
+        else:
+            key = CollectionStats.OVERALL
+            scope = "Overall"
+
+        if not STATS.built:
+            # Aufbau läuft noch (Start/Katalog-Refresh) → Interaction offen halten und abwarten
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            await asyncio.shield(build_stats())
+            if not STATS.built:
+                await interaction.followup.send("The leaderboard isn't ready yet – please try again in a moment.",
+                                                ephemeral=True)
+                return
+        board = STATS.board(key)
+        top = max(1, min(top, 25))
+        lines = []
+        for place, (uid, value) in enumerate(board.top(top), 1):
+            lines.append(f"`{place:2}.` <@{uid}> • **{format_number(value)}**/s")
+
+        embed = discord.Embed(
+            title=f"Brainrot leaderboard – {scope}",
+            description="\n".join(lines) or "Nobody has collected anything here yet.",
+            color=0xf1c40f
+        )
+
+        user_id = str(interaction.user.id)
+        my_rank = board.rank(user_id)
+        if my_rank is not None:
+            if rarity:
+                owned = STATS.rarity_counts.get(user_id, {}).get(rarity, 0)
+            elif index:
+                owned = STATS.index_counts.get(user_id, {}).get(index, 0)
+            else:
+                owned = sum(STATS.rarity_counts.get(user_id, {}).values())
+            embed.add_field(
+                name="Your rank",
+                value=f"**#{my_rank}** of {len(board)} • {format_number(board.score(user_id))}/s • {owned} owned",
+                inline=False
+            )
+        embed.set_footer(text=f"{len(board)} collectors ranked • value = sum of income/s over all owned mutations")
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
     # ───── MISSING – Alle fehlenden Pets für einen Index + Post-Button ─────
     @group.command(name="missing", description="Show all missing brainrots for a specific index")
     @app_commands.describe(
@@ -547,97 +931,64 @@ class Brainrot(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         user_id = str(interaction.user.id)
-        owns = OWN_DB.get(user_id, {})
-
-        # Alle Pets, die der User noch NICHT als diesen Index hat
-        missing_pets = []
-        for name, data in ITEM_DB.items():
-            if index == "Candy":
-                item_sets = data.get("fixed_sets", [])
-                if "Candy" not in item_sets:
-                    continue  # Überspringe Items, die nicht zum Candy-Set gehören
-            if name not in owns or index not in owns[name]:
-                missing_pets.append((name, data))
-
-        if not missing_pets:
-                await interaction.response.send_message(
-                    f"You have **ALL brainrots** in {INDEX_EMOJIS.get(index, '⚪️')} `{index}`!\n"
-                    f"**LEGENDARY!**",
-                    ephemeral=True
-                )
-                return
-
-        # 1. Definiere die gewünschte Reihenfolge der Seltenheiten
-        rarity_order = ["Common", "Rare", "Epic", "Legendary", "Mythical", "Brainrot God", "Secret", "OG"]
-
-        # 2. Sortiere erst nach Rarity-Index, dann nach Wert
-        missing_pets.sort(key=lambda x: (
-            rarity_order.index(x[1].get("rarity", "Common")) if x[1].get("rarity") in rarity_order else 99,
-            x[1].get("wert", 0)
-        ))
-
-        display_items = missing_pets
-        filter_start = 1
-
-        if filter:
-            filter_lower = filter.lower()
-            if filter_lower == "all":
-                # Alle anzeigen
-                pass
-            elif filter_lower in ["secret", "legendary", "mythical", "epic", "rare", "common"]:
-                # Nur bestimmte Rarity
-                display_items = [item for item in missing_pets if item[1].get("rarity", "").lower() == filter_lower]
-            elif "-" in filter_lower:
-                # z. B. "30-60"
-                try:
-                    start_str, end_str = filter_lower.split("-")
-                    filter_start = int(start_str)
-                    start = filter_start - 1  # 1-basiert → 0-basiert
-                    end = int(end_str)
-                    display_items = missing_pets[start:end]
-                except:
-                    await interaction.followup.send("Invalid range! Use e.g. `30-60`", ephemeral=True)
-                    return
-            else:
-                await interaction.followup.send(
-                    "Invalid filter! Use `all`, `secret`, `legendary`, or `30-60`", ephemeral=True)
-                return
 
-        total_missing = len(missing_pets) # Gesamtzahl der fehlenden (im gewählten Index)
-        limit = 70
-        lines = []
+        if not get_missing(user_id, index).ids:
+            await interaction.followup.send(
+                f"You have **ALL brainrots** in {INDEX_EMOJIS.get(index, '⚪️')} `{index}`!\n"
+                f"**LEGENDARY!**",
+                ephemeral=True
+            )
+            return
 
-        for i, (name, data) in enumerate(display_items[:limit], 1):
-            number_str = int(filter_start) + i - 1
-            rarity = data.get("rarity", "❔")
-            emoji = RARITY_EMOJIS.get(rarity, "❔")
-            lines.append(f"`{number_str:2}.` {emoji} **{name}**")
+        # Sortierte Fehlliste aus dem Cache – Filter schneiden nur noch Teilstücke heraus
+        try:
+            filter = normalize_missing_filter(filter)
+            source = missing_source(user_id, index, filter)
+        except ValueError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
 
-        if len(display_items) > limit:
-            lines.append(f"\n... and **{len(display_items) - limit} more** filtered results")
+        embed, view = render_list_page("m", f"{OWN_INDEXES.index(index)}.{filter}", source, 0)
+        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
-        title_suffix = ""
-        if filter:
-            if filter.lower() == "all":
-                title_suffix = " (ALL)"
-            elif filter.lower() in ["secret", "legendary", "mythical", "epic", "rare", "common"]:
-                title_suffix = f" ({filter.capitalize()} only)"
-            elif "-" in filter:
-                title_suffix = f" (Nr. {filter})"
+    # ───── SEARCH – Filter kombinieren (Rarity, Type, Set, Wert/Kosten, Besitz) ─────
+    @group.command(name="search", description="Search brainrots by rarity, type, set, value, cost and ownership")
+    @app_commands.describe(
+        rarity="Rarity (e.g. Secret)",
+        type="Type (e.g. Fishing)",
+        set="Set (e.g. Candy)",
+        value="Value range, e.g. 1M-5B, 1M- (at least) or -500K (at most)",
+        cost="Cost range, e.g. 10M-1B",
+        owned="Only items you own / are missing in the given index",
+        index="Index for the owned/missing filter",
+        sort="Sort order (default: value, highest first)"
+    )
+    @app_commands.choices(
+        owned=[app_commands.Choice(name="owned", value="owned"), app_commands.Choice(name="missing", value="missing")],
+        sort=[app_commands.Choice(name=name.replace("_", " "), value=name) for name in SORTS],
+    )
+    @app_commands.autocomplete(rarity=rarity_autocomplete, type=type_autocomplete,
+                               set=set_autocomplete, index=index_autocomplete)
+    async def search(self, interaction: discord.Interaction, rarity: str = '', type: str = '', set: str = '',
+                     value: str = '', cost: str = '', owned: str = '', index: str = '', sort: str = 'value_desc'):
+        try:
+            plan = CATALOG.compile(rarity=rarity, type=type, set=set, wert=value, kosten=cost,
+                                   owned=owned, index=index, sort=sort)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
 
-        embed = discord.Embed(
-            title=f"Missing brainrots of {INDEX_EMOJIS.get(index, '⚪️')} `{index}`{title_suffix}",
-            description="\n".join(lines),
-            color=0xe74c3c
-        )
-        embed.set_footer(text=f"Total missing: {total_missing} • Showing {len(display_items)}")
+        if len(plan.arg) > SEARCH_ARG_MAX:
+            await interaction.response.send_message("Too many filters for one search – please shorten them.", ephemeral=True)
+            return
 
-        if display_items:
-            top_img = display_items[0][1].get("image")
-            if top_img and top_img.startswith(("http://", "https://")):
-                embed.set_thumbnail(url=top_img)
+        source = search_source(plan, str(interaction.user.id))
+        if not source.items:
+            await interaction.response.send_message(f"No brainrots match **{plan.summary}**.", ephemeral=True)
+            return
 
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        embed, view = render_list_page("s", plan.arg, source, 0)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     # ───── INTERACTIVE EDITOR – Toggle Items per Button! ─────
     @group.command(name="editor", description="Interactively add/remove items for a specific index")
@@ -649,146 +1000,144 @@ class Brainrot(commands.Cog):
                 f"Invalid index! Possible: {', '.join(OWN_INDEXES)}", ephemeral=True)
             return
 
-        # 1. Filterung: Nur Items anzeigen, die für diesen Index gültig sind
-        filtered_items = []
-        for name, data in ITEM_DB.items():
-            if index == "Candy":
-                # Nur Items, die das Candy-Tag haben
-                if "Candy" in data.get("fixed_sets", []):
-                    filtered_items.append((name, data))
-            else:
-                # Für alle anderen Indizes (Gold, Radioactive etc.) alle Items nehmen
-                filtered_items.append((name, data))
-
-        # Sortierung: Zuerst nach Rarity (Reihenfolge wie im Spiel), dann absteigend nach Wert
-        rarity_order = ["Common", "Rare", "Epic", "Legendary", "Mythical", "Brainrot God", "Secret", "OG"]
-        
-        # Sortier-Funktion: Erst Rarity-Index, dann Wert
-        def sort_key(item_tuple):
-            name, data = item_tuple
-            r = data.get("rarity", "Common")
-            r_idx = rarity_order.index(r) if r in rarity_order else 99
-            return (r_idx, data.get("wert", 0)) # -wert für absteigend innerhalb der Rarity
-
-        filtered_items.sort(key=sort_key)
-        
-        # Nur die Namen für die View extrahieren
-        final_item_names = [name for name, _ in filtered_items]
-        
-        items_per_page = 16
         user_id = str(interaction.user.id)
-        owns = OWN_DB.get(user_id, {})
 
-        # Nachricht senden und View starten
+        # Gefilterte + sortierte ids: ein geteiltes Tupel pro Index für alle offenen Editoren
+        item_ids = VIEWS.sequences.get(("editor", index), ITEM_IDS.version, lambda: editor_items(index))
+
         await interaction.response.send_message(embed=discord.Embed(title="Loading Editor..."), ephemeral=True)
-        sent_message = await interaction.original_response()
 
-        # Nutze die gefilterte Liste final_item_names statt ITEM_DB.items()
-        view = ItemEditorView(final_item_names, index, owns, user_id, items_per_page)
-        await view.send_page(sent_message, 0)
+        view = ItemEditorView(item_ids, index, user_id, items_per_page=16)
+        view.attach(interaction)
+        await view.send_now()
+
+
+# ───── Persistente Buttons – der Zustand steckt in der custom_id bzw. in VIEWS ─────
+class EditorButton(discord.ui.DynamicItem[discord.ui.Button],
+                   template=r"br:ed:(?P<key>[0-9]+):(?P<action>[tp]):(?P<arg>[0-9]+)"):
+    """custom_id = br:ed:<VIEWS-Schlüssel>:<t = Toggle | p = Seite>:<item_id | Seite>"""
 
+    def __init__(self, key: int, action: str, arg: int, **button_kwargs):
+        super().__init__(discord.ui.Button(custom_id=f"br:ed:{key}:{action}:{arg}", **button_kwargs))
+        self.key = key
+        self.action = action
+        self.arg = arg
 
-class ItemEditorView(discord.ui.View):
-    def __init__(self, all_items, index, owns, user_id, items_per_page=20):
-        super().__init__(timeout=600)
-        self.all_items = all_items
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["key"]), match["action"], int(match["arg"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        view = VIEWS.get(self.key)
+        if view is None or view.user_id != str(interaction.user.id):
+            await interaction.response.send_message(
+                "This editor has expired – open a new one with `/brainrot editor`.", ephemeral=True)
+            return
+        if self.action == "t":
+            await view.toggle(interaction, self.arg)
+        else:
+            await view.turn_page(interaction, self.arg)
+
+
+class ItemEditorView:
+    """
+    Zustand eines offenen Editors. Kein discord.ui.View und nicht im ViewStore:
+    die Buttons sind EditorButtons, die über den VIEWS-Schlüssel hierher zurückfinden.
+    Lebensdauer und Obergrenzen regelt VIEWS.
+    """
+
+    def __init__(self, all_items: tuple, index: str, user_id: str, items_per_page: int = 20):
+        self.all_items = all_items  # geteilt über VIEWS.sequences – nicht verändern
         self.index = index
-        self.owns = owns
         self.user_id = user_id
         self.items_per_page = items_per_page
         self.current_page = 0
         self.total_pages = (len(all_items) + items_per_page - 1) // items_per_page
+        self.coalescer: EditCoalescer | None = None
+        self.key = VIEWS.register(user_id, self)
+        print(f"[VIEWS] {VIEWS.report()}")
+
+    def attach(self, interaction: discord.Interaction):
+        """Merkt sich die Interaction-Daten für Webhook-Edits; Klicks werden ab jetzt gebündelt."""
+        self._application_id = interaction.application_id
+        self._token = interaction.token
+        self.coalescer = EditCoalescer(self._edit_payload, self._send_edit, window=EDIT_COALESCE_WINDOW)
+
+    def close(self):
+        # Von VIEWS beim Verdrängen/Ablaufen aufgerufen
+        if self.coalescer:
+            self.coalescer.close()
+
+    def _edit_payload(self) -> dict:
+        # Wegwerf-View nur zum Serialisieren der Buttons – wird nirgends registriert
+        container = discord.ui.View(timeout=None)
+        embed = self.render_page(self.current_page, container)
+        return {"embeds": [embed.to_dict()], "components": container.to_components()}
+
+    async def _send_edit(self, payload: dict):
+        await EDIT_HTTP.edit_original_response(self._application_id, self._token, payload)
+
+    async def send_now(self):
+        """Erste Seite sofort, ohne Coalescing-Fenster."""
+        await self._send_edit(self._edit_payload())
+
+    def request_page(self, page: int):
+        """Nur Zustand merken – der Edit kommt gesammelt nach EDIT_COALESCE_WINDOW."""
+        self.current_page = page
+        self.coalescer.request()
 
-    async def send_page(self, message: discord.Message | None, page: int):
+    async def toggle(self, interaction: discord.Interaction, item_id: int):
+        await interaction.response.defer()
+        if not await own_remove(self.user_id, item_id, self.index):
+            await own_add(self.user_id, item_id, self.index)
+        save_own()
+        self.request_page(self.current_page)
+
+    async def turn_page(self, interaction: discord.Interaction, page: int):
+        await interaction.response.defer()
+        self.request_page(min(max(page, 0), self.total_pages - 1))
+
+    def render_page(self, page: int, container: discord.ui.View) -> discord.Embed:
         self.current_page = page
+        owns = OWN_DB.get(self.user_id, {})
         start = page * self.items_per_page
         end = start + self.items_per_page
         page_items = self.all_items[start:end]
 
         # Fortschritt berechnen: Wie viele der gefilterten Items besitzt der User?
+        bit = INDEX_BITS[self.index]
         owned_count = 0
-        for name in self.all_items:
-            if name in self.owns and self.index in self.owns[name]:
+        for item_id in self.all_items:
+            if owns.get(item_id, 0) & bit:
                 owned_count += 1
 
         total_count = len(self.all_items)
         percentage = (owned_count / total_count * 100) if total_count > 0 else 0
 
-        # Update buttons
-        self.clear_items()
-        
-        '''
-        # Navigation
-        if self.total_pages > 1:
-            if page > 0:
-                prev = discord.ui.Button(label="◀", style=discord.ButtonStyle.blurple, row=0)
-                prev.callback = lambda i: self._page_callback(i, message, page - 1)
-                self.add_item(prev)
-            else:
-                spacer = discord.ui.Button(label="◀", style=discord.ButtonStyle.gray, row=0, disabled=True)
-                self.add_item(spacer)
-
-            if page < self.total_pages - 1:
-                next_btn = discord.ui.Button(label="▶", style=discord.ButtonStyle.blurple, row=0)
-                next_btn.callback = lambda i: self._page_callback(i, message, page + 1)
-                self.add_item(next_btn)
-            else:
-                spacer = discord.ui.Button(label="▶", style=discord.ButtonStyle.gray, row=0, disabled=True)
-                self.add_item(spacer)
-        '''
-
-        # Navigation Buttons (Row 0)
+        # Navigation Buttons (Row 0) – Ziel-Seite steckt in der custom_id
         if self.total_pages > 1:
-            # Zurück Button
+            last = self.total_pages - 1
             prev_style = discord.ButtonStyle.blurple if page > 0 else discord.ButtonStyle.gray
-            prev = discord.ui.Button(label="◀", style=prev_style, row=0, disabled=(page == 0))
-            prev.callback = lambda i: self._page_callback(i, message, page - 1)
-            self.add_item(prev)
-
-            # Weiter Button
-            next_style = discord.ButtonStyle.blurple if page < self.total_pages - 1 else discord.ButtonStyle.gray
-            next_btn = discord.ui.Button(label="▶", style=next_style, row=0, disabled=(page == self.total_pages - 1))
-            next_btn.callback = lambda i: self._page_callback(i, message, page + 1)
-            self.add_item(next_btn)
+            container.add_item(EditorButton(self.key, "p", max(page - 1, 0),
+                                            label="◀", style=prev_style, row=0, disabled=(page == 0)))
+            next_style = discord.ButtonStyle.blurple if page < last else discord.ButtonStyle.gray
+            container.add_item(EditorButton(self.key, "p", min(page + 1, last),
+                                            label="▶", style=next_style, row=0, disabled=(page == last)))
 
         # Item Buttons (Ab Row 1)
         row = 1
         MAX_NAME_LEN = 28
-        PADDING_CHAR = " "
+        PADDING_CHAR = " "
 
-        for i, name in enumerate(page_items):
-            has_it = name in self.owns and self.index in self.owns[name]
-            status = INDEX_EMOJIS.get(self.index, '⚪️') if has_it else '⚫️'
+        for i, item_id in enumerate(page_items):
+            name = ITEM_IDS.name(item_id) or f"#{item_id}"  # seit einem Katalog-Refresh entfernt
+            has_it = bool(owns.get(item_id, 0) & bit)
             style = discord.ButtonStyle.success if has_it else discord.ButtonStyle.secondary
 
             display_name = name[:MAX_NAME_LEN]
-            #label = f"{name:<{button_width}}".replace(" ", " ")
             padded_name = display_name + PADDING_CHAR * (MAX_NAME_LEN - len(display_name))
-            label = f"{padded_name}"
-            btn = discord.ui.Button(label=label, style=style, row=row, custom_id=f"toggle_{name}")
-
-            async def toggle(inter: discord.Interaction, n=name, b=btn):
-                await inter.response.defer()
-
-                user_owns = OWN_DB.setdefault(self.user_id, {})
-                item_entry = user_owns.setdefault(n, [])
-
-                if self.index in item_entry:
-                    item_entry.remove(self.index)
-                    if not item_entry:
-                        user_owns.pop(n, None)
-                    #b.style = discord.ButtonStyle.secondary
-                else:
-                    if self.index not in item_entry:
-                        item_entry.append(self.index)
-                    #b.style = discord.ButtonStyle.success
-
-                save_json(OWN_FILE, OWN_DB)
-                await self.send_page(message, self.current_page)
-
-            btn.callback = toggle
-            self.add_item(btn)
-            
+            container.add_item(EditorButton(self.key, "t", item_id, label=padded_name, style=style, row=row))
+
             if (i + 1) % 4 == 0:
                 row += 1
 
@@ -796,8 +1145,9 @@ class ItemEditorView(discord.ui.View):
 
         # Liste der Items auf der Seite
         lines = []
-        for name in page_items:
-            has_it = name in self.owns and self.index in self.owns[name]
+        for item_id in page_items:
+            has_it = bool(owns.get(item_id, 0) & bit)
+            name = ITEM_IDS.name(item_id) or f"#{item_id}"
             status_emoji = index_emoji if has_it else '⚫️'
             lines.append(f"{status_emoji} `{name}`")
 
@@ -807,73 +1157,294 @@ class ItemEditorView(discord.ui.View):
             color=0x2ecc71
         )
         embed.set_footer(text=f"Page {page + 1}/{self.total_pages} • Click to toggle possession")
+        return embed
 
 
-        # Nachricht rendern
-        await message.edit(embed=embed, view=self)
+class PostPublicButton(discord.ui.DynamicItem[discord.ui.Button], template=r"br:post:(?P<index>[0-9]+)"):
+    """Postet die Fehlliste öffentlich – die Liste kommt erst beim Klick aus MISSING_CACHE."""
 
+    def __init__(self, index: str):
+        super().__init__(discord.ui.Button(
+            label="Post in channel",
+            style=discord.ButtonStyle.danger,
+            emoji="📣",
+            custom_id=f"br:post:{OWN_INDEXES.index(index)}",
+        ))
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(OWN_INDEXES[int(match["index"])])
+
+    async def callback(self, interaction: discord.Interaction):
+        user = interaction.user
+        source = missing_source(str(user.id), self.index)
+        source.title = f"{user.display_name}'s missing brainrots ({INDEX_EMOJIS.get(self.index, '⚪️')} `{self.index}`)"
+        source.footer = f"{len(source.items)} missing • posted by {user.display_name}"
+        source.thumbnail = user.display_avatar.url
+        source.actions = ()
+
+        embed, view = render_list_page("p", f"{user.id}.{OWN_INDEXES.index(self.index)}", source, 0)
+        await interaction.response.send_message(embed=embed, view=view)
 
-    async def _page_callback(self, inter: discord.Interaction, message, new_page):
-        await inter.response.defer()  # <── FIX
-        await self.send_page(message, new_page)
 
+# ───── Remove-Buttons ─────
+class RemoveButton(discord.ui.DynamicItem[discord.ui.Button], template=r"br:rm:(?P<item_id>[0-9]+):(?P<bit>[0-9]+)"):
+    """custom_id = br:rm:<item_id>:<Bit-Position>; der User kommt aus der Interaction."""
 
-class PostPublicButton(discord.ui.View):
-    def __init__(self, missing_pets: list, index: str, user: discord.User | discord.Member):
-        super().__init__(timeout=300)
-        self.missing_pets = missing_pets
+    def __init__(self, item_id: int, index: str):
+        super().__init__(discord.ui.Button(
+            label=index, style=discord.ButtonStyle.danger, custom_id=f"br:rm:{item_id}:{OWN_INDEXES.index(index)}"))
+        self.item_id = item_id
         self.index = index
-        self.user = user
 
-        # Dynamic button – exactly like your working RemoveView
-        btn = discord.ui.Button(
-            label="Post in channel",
-            style=discord.ButtonStyle.danger,
-            emoji="Megaphone"
-        )
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["item_id"]), OWN_INDEXES[int(match["bit"])])
 
-        async def callback(interaction: discord.Interaction):
-            await interaction.response.edit_message(view=None)
+    async def callback(self, interaction: discord.Interaction):
+        user_id = str(interaction.user.id)
+        await own_remove(user_id, self.item_id, self.index)
+        if not OWN_DB.get(user_id, True):
+            OWN_DB.pop(user_id, None)
+        save_own()
+        await interaction.response.edit_message(
+            content=f"Removed **{self.index}** mutation of **{ITEM_IDS.name(self.item_id)}**.", view=None)
 
-            lines = []
-            for i, (name, data) in enumerate(self.missing_pets, 1):
-                value = format_number(data.get("wert", 0))
-                rarity = data.get("rarity", "❔")
-                lines.append(f"`{i:3}.` **{name}** • {rarity} • {value}")
 
-            embed = discord.Embed(
-                title=f"{self.user.display_name}'s missing brainrots ({INDEX_EMOJIS.get(self.index, '⚪️')} `{self.index}`)",
-                description="\n".join(lines),
-                color=0xe74c3c
-            )
-            embed.set_footer(text=f"{len(self.missing_pets)} missing • posted by {self.user.display_name}")
-            embed.set_thumbnail(url=self.user.display_avatar.url)
+class RemoveView(discord.ui.View):
+    # Nur DynamicItems → discord.py hält für diese Nachricht keinen View im Speicher
+    def __init__(self, item_id: int, indexes: list):
+        super().__init__(timeout=None)
+        for idx in indexes:
+            self.add_item(RemoveButton(item_id, idx))
 
-            await interaction.followup.send(embed=embed)
+# ───── Lange Listen: Seiten im Embed-Budget, Cursor-Buttons, CSV-Export ─────
+MISSING_RARITY_FILTERS = ["secret", "legendary", "mythical", "epic", "rare", "common"]
+LIST_CSV_HEADER = ("nr", "name", "rarity", "wert", "kosten", "type")
 
-        btn.callback = callback
-        self.add_item(btn)
 
+class ListSource:
+    """Eine jederzeit neu ableitbare Liste plus alles, was zum Rendern einer Seite nötig ist."""
+    __slots__ = ("title", "items", "fmt", "color", "footer", "offset", "thumbnail", "filename", "actions")
 
-# ───── Remove-Button-View ─────
-class RemoveView(discord.ui.View):
-    def __init__(self, item: str, indexes: list, user_id: str):
-        super().__init__(timeout=60)
-        self.item = item
-        self.user_id = user_id
+    def __init__(self, title: str, items, fmt, color: int, footer: str, filename: str,
+                 offset: int = 0, actions: tuple = ()):
+        self.title = title
+        self.items = items          # Sequenz von Item-ids (meist geteilt/gecacht – nicht verändern)
+        self.fmt = fmt              # (pos, item_id) → Zeile
+        self.color = color
+        self.footer = footer
+        self.filename = filename
+        self.offset = offset        # Nummerierung beginnt bei offset + 1 (Bereichsfilter)
+        self.thumbnail = None       # None → Bild des ersten Items der Seite
+        self.actions = actions      # zusätzliche Buttons unter der Liste
+
+
+def normalize_missing_filter(filter: str) -> str:
+    """
+    Filter in kanonischer Form – so landet er in der custom_id (max. 100 Zeichen):
+    Bereiche als geclampte Zahlen ('0030-99999999…' → '30-358'). ValueError bei ungültigem Bereich.
+    """
+    filter = filter.strip().lower()
+    if "-" not in filter:
+        return filter
+    try:
+        start_str, end_str = filter.split("-")
+        start, end = int(start_str), int(end_str)
+    except ValueError:
+        raise ValueError("Invalid range! Use e.g. `30-60`")
+    limit = len(ITEM_IDS.by_id)  # mehr Items kann keine Fehlliste haben
+    return f"{min(max(start, 1), limit + 1)}-{min(max(end, 0), limit)}"
+
+
+def missing_source(user_id: str, index: str, filter: str = "") -> ListSource:
+    """Fehlliste für /brainrot missing; ValueError bei ungültigem Filter."""
+    entry = get_missing(user_id, index)
+    items = entry.ids
+    offset = 0
+    title_suffix = ""
+    filter_lower = filter.lower()
+    if filter_lower == "all":
+        title_suffix = " (ALL)"
+    elif filter_lower in MISSING_RARITY_FILTERS:
+        # Nur bestimmte Rarity (liegt im Cache als zusammenhängender Block)
+        items = entry.by_rarity(filter_lower)
+        title_suffix = f" ({filter_lower.capitalize()} only)"
+    elif "-" in filter_lower:
+        # z. B. "30-60"
+        try:
+            start_str, end_str = filter_lower.split("-")
+            offset = max(int(start_str) - 1, 0)  # 1-basiert → 0-basiert
+            items = entry.ids[offset:int(end_str)]
+        except ValueError:
+            raise ValueError("Invalid range! Use e.g. `30-60`")
+        title_suffix = f" (Nr. {filter})"
+    elif filter_lower:
+        raise ValueError("Invalid filter! Use `all`, `secret`, `legendary`, or `30-60`")
+
+    def fmt(pos: int, item_id: int) -> str:
+        rarity = ITEM_IDS.by_id[item_id].get("rarity", "❔")
+        return f"`{offset + pos + 1:2}.` {RARITY_EMOJIS.get(rarity, '❔')} **{ITEM_IDS.name(item_id)}**"
+
+    return ListSource(
+        title=f"Missing brainrots of {INDEX_EMOJIS.get(index, '⚪️')} `{index}`{title_suffix}",
+        items=items, fmt=fmt, color=0xe74c3c,
+        footer=f"Total missing: {len(entry.ids)}",
+        filename=f"missing_{index.lower()}.csv",
+        offset=offset,
+        actions=(PostPublicButton(index),),
+    )
+
+
+def public_missing_fmt(pos: int, item_id: int) -> str:
+    data = ITEM_IDS.by_id[item_id]
+    return f"`{pos + 1:3}.` **{ITEM_IDS.name(item_id)}** • {data.get('rarity', '❔')} • {format_number(data.get('wert', 0))}"
+
+
+def type_fmt(pos: int, item_id: int) -> str:
+    data = ITEM_IDS.by_id[item_id]
+    emoji = RARITY_EMOJIS.get(data.get("rarity", "❔"), "❔")
+    wert = format_number(data.get("wert", 0))
+    return f"`{pos + 1:2}.` {emoji} **{ITEM_IDS.name(item_id)}** • {wert} • _{', '.join(item_types(data))}_"
+
+
+def type_source(type: str) -> ListSource:
+    items = query_items(type=type)  # nach Wert absteigend
+    return ListSource(
+        title=f"{type.capitalize()} Brainrots",
+        items=items, fmt=type_fmt, color=0x3498db,
+        footer=f"Total: {len(items)} • Sorted by value",
+        filename=f"type_{type.lower().replace(' ', '_')}.csv",
+    )
+
+
+SEARCH_ARG_MAX = 85  # Filter stehen in der custom_id (max. 100 Zeichen inkl. "br:pg:s:…:<Cursor>")
+
+def search_fmt(pos: int, item_id: int) -> str:
+    data = ITEM_IDS.by_id[item_id]
+    emoji = RARITY_EMOJIS.get(data.get("rarity", "❔"), "❔")
+    return (f"`{pos + 1:2}.` {emoji} **{ITEM_IDS.name(item_id)}** • "
+            f"value {format_number(data.get('wert', 0))} • cost {format_number(data.get('kosten', 0))}")
+
+
+def search_source(plan, user_id: str) -> ListSource:
+    items = CATALOG.run(plan, OWN_DB.get(user_id, {}))
+    return ListSource(
+        title="Search results",
+        items=items, fmt=search_fmt, color=0x9b59b6,
+        footer=f"{plan.summary} • {len(items)} found",
+        filename="search.csv",
+    )
+
+
+def list_source(kind: str, arg: str, user_id: str) -> ListSource:
+    """Baut die Liste eines Buttons aus seiner custom_id neu auf (m = missing, p = öffentlicher Post, s = search, t = type)."""
+    if kind == "m":
+        bit, _, filter = arg.partition(".")
+        return missing_source(user_id, OWN_INDEXES[int(bit)], filter)
+    if kind == "p":
+        owner_id, _, bit = arg.partition(".")
+        index = OWN_INDEXES[int(bit)]
+        source = missing_source(owner_id, index)
+        source.fmt = public_missing_fmt
+        source.footer = f"{len(source.items)} missing"
+        source.actions = ()
+        return source
+    if kind == "s":
+        return search_source(CATALOG.from_arg(arg), user_id)
+    return type_source(arg)
+
+
+def render_list_page(kind: str, arg: str, source: ListSource, cursor: int) -> tuple[discord.Embed, discord.ui.View]:
+    """Eine Seite ab `cursor` + Buttons (◀ ▶ nur bei mehr als einer Seite, CSV-Export)."""
+    items = source.items
+    if cursor >= len(items):
+        cursor = page_before(items, len(items), source.fmt)  # Liste ist seitdem geschrumpft
+    lines, end = page_at(items, cursor, source.fmt)
+
+    embed = discord.Embed(title=source.title, description="\n".join(lines) or "Nothing left here.", color=source.color)
+    embed.set_footer(text=f"{source.footer} • Showing {source.offset + cursor + 1}–{source.offset + end} of {source.offset + len(items)}"
+                     if lines else source.footer)
+    if source.thumbnail:
+        embed.set_thumbnail(url=source.thumbnail)
+    elif lines:
+        set_thumbnail_if_valid(embed, ITEM_IDS.by_id[items[cursor]].get("image"))
+
+    view = discord.ui.View(timeout=None)
+    if cursor > 0 or end < len(items):
+        view.add_item(ListPageButton(kind, arg, page_before(items, cursor, source.fmt),
+                                     label="◀", style=discord.ButtonStyle.blurple, disabled=cursor == 0))
+        view.add_item(ListPageButton(kind, arg, end,
+                                     label="▶", style=discord.ButtonStyle.blurple, disabled=end >= len(items)))
+        view.add_item(ListFileButton(kind, arg))
+    for action in source.actions:
+        view.add_item(action)
+    return embed, view
+
+
+class ListPageButton(discord.ui.DynamicItem[discord.ui.Button],
+                     template=r"br:pg:(?P<kind>[mpst]):(?P<arg>[^:]*):(?P<cursor>[0-9]+)"):
+    """custom_id = br:pg:<Listenart>:<Parameter>:<Cursor der Zielseite>"""
+
+    def __init__(self, kind: str, arg: str, cursor: int, **button_kwargs):
+        super().__init__(discord.ui.Button(custom_id=f"br:pg:{kind}:{arg}:{cursor}", **button_kwargs))
+        self.kind = kind
+        self.arg = arg
+        self.cursor = cursor
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["kind"], match["arg"], int(match["cursor"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        try:
+            source = list_source(self.kind, self.arg, str(interaction.user.id))
+        except (ValueError, IndexError):
+            await interaction.response.send_message("This list is no longer available.", ephemeral=True)
+            return
+        if self.kind == "p" and interaction.message and interaction.message.embeds:
+            # Titel/Bild des Posts bleiben (Name & Avatar des Posters kennen wir hier nicht)
+            old = interaction.message.embeds[0]
+            source.title = old.title
+            source.thumbnail = old.thumbnail.url if old.thumbnail else None
+        embed, view = render_list_page(self.kind, self.arg, source, self.cursor)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+class ListFileButton(discord.ui.DynamicItem[discord.ui.Button], template=r"br:dl:(?P<kind>[mpst]):(?P<arg>[^:]*)"):
+    """Komplette Liste als CSV-Anhang – zeilenweise geschrieben, nie als ein großer String."""
+
+    def __init__(self, kind: str, arg: str):
+        super().__init__(discord.ui.Button(label="CSV", emoji="📄", style=discord.ButtonStyle.secondary,
+                                           custom_id=f"br:dl:{kind}:{arg}"))
+        self.kind = kind
+        self.arg = arg
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["kind"], match["arg"])
+
+    async def callback(self, interaction: discord.Interaction):
+        try:
+            source = list_source(self.kind, self.arg, str(interaction.user.id))
+        except (ValueError, IndexError):
+            await interaction.response.send_message("This list is no longer available.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        def rows():
+            for pos, item_id in enumerate(source.items):
+                data = ITEM_IDS.by_id[item_id]
+                yield (source.offset + pos + 1, ITEM_IDS.name(item_id), data.get("rarity", ""),
+                       data.get("wert", 0), data.get("kosten", 0), ", ".join(item_types(data)))
+
+        f = await asyncio.to_thread(write_csv, LIST_CSV_HEADER, rows())
+        try:
+            await interaction.followup.send(file=discord.File(f, filename=source.filename), ephemeral=True)
+        finally:
+            f.close()
 
-        for idx in indexes:
-            btn = discord.ui.Button(label=idx, style=discord.ButtonStyle.danger)
-            async def cb(interaction: discord.Interaction, i=idx):
-                OWN_DB.setdefault(self.user_id, {}).setdefault(self.item, []).remove(i)
-                if not OWN_DB[self.user_id][self.item]:
-                    OWN_DB[self.user_id].pop(self.item, None)
-                if not OWN_DB[self.user_id]:
-                    OWN_DB.pop(self.user_id, None)
-                save_json(OWN_FILE, OWN_DB)
-                await interaction.response.edit_message(content=f"Removed **{i}** mutation of **{self.item}**.", view=None)
-            btn.callback = cb
-            self.add_item(btn)
 
 async def safe_post(interaction: discord.Interaction, content: str):
     if hasattr(interaction.channel, "send"):
@@ -890,26 +1461,18 @@ async def safe_post(interaction: discord.Interaction, content: str):
 # ───── Setup ─────
 async def setup(bot):
     await bot.add_cog(Brainrot(bot))
+    bot.add_dynamic_items(EditorButton, PostPublicButton, RemoveButton, ListPageButton, ListFileButton)
 
 @bot.event
 async def on_ready():
     print(f"Bot online → {bot.user}")
-    GUILD_ID = 1440275499661394074  # Setze hier eine Guild-ID für schnelle Tests, oder None für global
-    GUILD_ID_2 = 1444435956538277898
-    #await bot.tree.clear_commands(guild=None)
-    #await bot.tree.sync()
-    #print("Slash-Commands ready!")
 
+    if SHARD_IDS and 0 not in SHARD_IDS:
+        return  # Sharded: Commands synct nur der Prozess mit Shard 0
 
-    #guild2 = discord.Object(id=GUILD_ID_2)
-    #bot.tree.copy_global_to(guild=guild2)   # kopiert globale Befehle ins Guild
-    #await bot.tree.sync(guild=guild2)       # ← Sofort-Update NUR auf diesem Server!
-    #print(f"Commands refreshed on test server {GUILD_ID_2} !")
-    
-    guild = discord.Object(id=GUILD_ID)
-    bot.tree.copy_global_to(guild=guild)   # kopiert globale Befehle ins Guild
-    await bot.tree.sync(guild=guild)       # ← Sofort-Update NUR auf diesem Server!
-    print(f"Commands refreshed on test server {GUILD_ID} !")
+    # Läuft auch bei Reconnects – gesynct wird nur, wenn sich der Command-Baum geändert hat
+    await sync_if_changed(bot.tree, bot.application_id, SYNC_TARGETS,
+                          CommandSyncState(COMMAND_SYNC_STATE), force=SYNC_FORCE)
 
 
 @bot.event
@@ -920,7 +1483,20 @@ async def on_interaction(interaction: discord.Interaction):
 async def main():
     async with bot:
         await setup(bot)
-        await bot.start(TOKEN)
+        build_stats()
+        tasks = [asyncio.create_task(catalog_refresh_loop())]
+        if WEB_SYNC:
+            tasks.append(asyncio.create_task(web_sync_loop()))
+        if OWN_STORE:
+            tasks.append(asyncio.create_task(OWNERSHIP.poll_loop(STORE_POLL_INTERVAL)))  # Änderungen anderer Prozesse
+        try:
+            await bot.start(TOKEN)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await EDIT_HTTP.close()
+            await REFRESHER.close()
+            await close_own()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
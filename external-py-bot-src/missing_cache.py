@@ -0,0 +1,71 @@
+# missing_cache.py
+# LRU-Cache für die sortierte "fehlt noch"-Liste pro (User, Index).
+# Einträge sind an die Besitz-Version des Users und die Katalog-Version gebunden;
+# Mutationen eines Users werfen nur dessen Einträge raus.
+from collections import OrderedDict
+from typing import Callable
+
+
+class MissingEntry:
+    __slots__ = ("ids", "rarity_spans", "user_version", "catalog_version")
+
+    def __init__(self, ids: tuple, rarity_spans: dict, user_version: int, catalog_version: int):
+        self.ids = ids                    # fehlende Item-ids, sortiert nach Rarity, dann Wert
+        self.rarity_spans = rarity_spans  # rarity (lowercase) → (start, end) in ids
+        self.user_version = user_version
+        self.catalog_version = catalog_version
+
+    def by_rarity(self, rarity: str) -> tuple:
+        start, end = self.rarity_spans.get(rarity.lower(), (0, 0))
+        return self.ids[start:end]
+
+
+class MissingCache:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], MissingEntry] = OrderedDict()
+        self._user_keys: dict[str, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, index: str, user_version: int, catalog_version: int,
+            compute: Callable[[], list[tuple[int, str]]]) -> MissingEntry:
+        """
+        compute() liefert die sortierte Liste [(item_id, rarity), ...]; wird nur bei
+        fehlendem oder veraltetem Eintrag aufgerufen.
+        """
+        key = (user_id, index)
+        entry = self._entries.get(key)
+        if entry and entry.user_version == user_version and entry.catalog_version == catalog_version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        rows = compute()
+        spans = {}
+        for pos, (_, rarity) in enumerate(rows):
+            r = (rarity or "").lower()
+            start, _ = spans.get(r, (pos, pos))
+            spans[r] = (start, pos + 1)
+        entry = MissingEntry(tuple(item_id for item_id, _ in rows), spans, user_version, catalog_version)
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._user_keys.setdefault(user_id, set()).add(index)
+        while len(self._entries) > self.max_entries:
+            (old_user, old_index), _ = self._entries.popitem(last=False)
+            keys = self._user_keys.get(old_user)
+            if keys:
+                keys.discard(old_index)
+                if not keys:
+                    del self._user_keys[old_user]
+        return entry
+
+    def invalidate_user(self, user_id: str):
+        for index in self._user_keys.pop(user_id, ()):
+            self._entries.pop((user_id, index), None)
+
+    def clear(self):
+        self._entries.clear()
+        self._user_keys.clear()
@@ -0,0 +1,148 @@
+# ownership.py
+# Besitz-Datenmodell des Bots: Items werden intern über die Katalog-`id` aus
+# brainrot_db.json geführt (wie in der Web-App), Mutationen als Bitflags.
+#
+#   OWN_DB = { "<discord_user_id>": { <item_id>: <flags>, ... }, ... }
+#
+# Bit i steht für OWN_INDEXES[i]. Die Reihenfolge ist Teil des Speicherformats –
+# neue Indexe nur hinten anhängen, niemals umsortieren!
+import json
+import os
+import sys
+
+OWN_INDEXES = ["Normal", "Gold", "Diamond", "Candy", "Rainbow", "Galaxy", "YinYang", "Radioactive"]
+INDEX_BITS = {name: 1 << i for i, name in enumerate(OWN_INDEXES)}
+
+OWN_FORMAT = 2  # 1 = name-keyed Listen (alt), 2 = id-keyed Bitflags
+
+
+def flags_to_indexes(flags: int) -> list[str]:
+    """Bitflags → Index-Namen in OWN_INDEXES-Reihenfolge."""
+    return [name for name, bit in INDEX_BITS.items() if flags & bit]
+
+
+def indexes_to_flags(indexes) -> int:
+    flags = 0
+    for idx in indexes:
+        flags |= INDEX_BITS.get(idx, 0)
+    return flags
+
+
+class OwnershipVersions:
+    """
+    Versionszähler pro User (+1 bei jeder Mutation) und die Menge der User,
+    die sich seit dem letzten Web-Sync geändert haben.
+    """
+
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self.pending: set[str] = set()
+        self.listeners: list = []  # callable(user_id) – z.B. Cache-Invalidierung
+
+    def bump(self, user_id: str):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self.pending.add(user_id)
+        for listener in self.listeners:
+            listener(user_id)
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+
+class ItemIds:
+    """Interning-Tabelle Name ↔ Katalog-id (eine Instanz pro geladenem Katalog)."""
+
+    def __init__(self, item_db: dict, version: int = 0):
+        self.version = version  # Katalog-Version, Teil der Cache-Keys abgeleiteter Daten
+        self.name_to_id: dict[str, int] = {}
+        self.id_to_name: dict[int, str] = {}
+        self.by_id: dict[int, dict] = {}
+        for name, data in item_db.items():
+            item_id = data.get("id")
+            if not isinstance(item_id, int):
+                print(f"[CATALOG] '{name}' hat keine gültige id – wird ignoriert")
+                continue
+            name = sys.intern(name)
+            self.name_to_id[name] = item_id
+            self.id_to_name[item_id] = name
+            self.by_id[item_id] = data
+
+    def id(self, name: str) -> int | None:
+        return self.name_to_id.get(name)
+
+    def name(self, item_id: int) -> str | None:
+        return self.id_to_name.get(item_id)
+
+
+def _migrate_v1(raw: dict, ids: ItemIds) -> dict:
+    """Altes Format {user: {item_name: [indexes]}} → {user: {item_id: flags}}."""
+    own_db = {}
+    unknown = 0
+    for user_id, items in raw.items():
+        if not isinstance(items, dict):
+            continue
+        user_items = {}
+        for item_name, value in items.items():
+            # Ganz alte Daten: einzelner Index als String
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list):
+                continue
+            item_id = ids.id(item_name)
+            if item_id is None:
+                unknown += 1
+                continue
+            flags = indexes_to_flags(value)
+            if flags:
+                user_items[item_id] = flags
+        if user_items:
+            own_db[user_id] = user_items
+    if unknown:
+        print(f"[MIGRATION] {unknown} Einträge mit unbekannten Item-Namen verworfen")
+    return own_db
+
+
+def load_ownership(path: str, ids: ItemIds, migrate_file: bool = True) -> dict:
+    """
+    Lädt ownership.json; name-keyed Altdaten werden migriert.
+    Mit migrate_file wird die Datei dabei umgeschrieben (Backup: <path>.v1.bak).
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            raw = json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    if raw.get("format") == OWN_FORMAT:
+        stored_indexes = raw.get("indexes", OWN_INDEXES)
+        if stored_indexes != OWN_INDEXES[:len(stored_indexes)]:
+            raise SystemExit(f"{path}: Index-Reihenfolge passt nicht zu OWN_INDEXES")
+        return {
+            user_id: {int(item_id): flags for item_id, flags in items.items() if flags}
+            for user_id, items in raw.get("users", {}).items()
+        }
+
+    own_db = _migrate_v1(raw, ids)
+    if not migrate_file:
+        return own_db
+    backup = path + ".v1.bak"
+    if not os.path.exists(backup):
+        os.replace(path, backup)
+    save_ownership(path, own_db)
+    print(f"[MIGRATION] {path} auf id-Format umgestellt (Backup: {backup})")
+    return own_db
+
+
+def save_ownership(path: str, own_db: dict):
+    data = {
+        "format": OWN_FORMAT,
+        "indexes": OWN_INDEXES,
+        "users": {user_id: {str(item_id): flags for item_id, flags in items.items()}
+                  for user_id, items in own_db.items() if items},
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -0,0 +1,79 @@
+# ownership_service.py
+# Einziger Schreibpfad für Besitz in einem Bot-Prozess: OWN_DB (Snapshot oder Shared Store),
+# Leaderboard-Aggregate und Versionszähler laufen hier gemeinsam – plus das Übernehmen
+# von Änderungen anderer Prozesse im Sharded-Betrieb.
+# Eigenes Modul, damit der Selbsttest in ownership_store.py genau diesen Code in
+# mehreren Prozessen fährt.
+import asyncio
+
+from ownership import INDEX_BITS
+from ownership_store import SharedOwnership
+
+
+class OwnershipService:
+    def __init__(self, own_db, stats, versions, items_by_id: dict):
+        self.own_db = own_db
+        self.stats = stats
+        self.versions = versions
+        self.items_by_id = items_by_id  # nach einem Katalog-Refresh neu setzen
+        self.shared = isinstance(own_db, SharedOwnership)
+        self.polls = 0
+
+    async def update(self, user_id: str, changes: list[tuple[int, int, int]]) -> list[int]:
+        """
+        Flag-Änderungen eines Users [(item_id, set_bits, clear_bits)] → alte Flags. Im Store-Modus
+        läuft alles in einer Transaktion im Worker-Thread statt Bit für Bit auf dem Event-Loop.
+        """
+        generation = self.stats.generation
+        if self.shared:
+            olds = await asyncio.to_thread(self.own_db.store.update_flags, user_id, changes)
+            self.own_db.apply_flags(user_id, changes, olds)
+        else:
+            olds = self.own_db.update_flags(user_id, changes)
+        if self.stats.generation != generation:
+            # Während des Schreibens wurden frisch gebaute Aggregate übernommen, die den Commit
+            # evtl. schon enthalten → neu zählen statt Deltas doppelt einzuspielen
+            if any(((old | s) & ~c) != old for (_, s, c), old in zip(changes, olds)):
+                self.stats.refresh_user(user_id, self.own_db.get(user_id, {}), self.items_by_id)
+                self.versions.bump(user_id)
+            return olds
+        changed = False
+        for (item_id, set_bits, clear_bits), old in zip(changes, olds):
+            new = (old | set_bits) & ~clear_bits
+            if new == old:
+                continue
+            changed = True
+            data = self.items_by_id.get(item_id)
+            if not data:
+                continue
+            flags = old
+            for index, bit in INDEX_BITS.items():
+                if (old ^ new) & bit:
+                    after = flags ^ bit
+                    self.stats.apply(user_id, data, index, +1 if new & bit else -1,
+                                     1 if not flags else (-1 if not after else 0))
+                    flags = after
+        if changed:
+            self.versions.bump(user_id)
+        return olds
+
+    async def poll(self) -> set[str]:
+        """Änderungen anderer Prozesse übernehmen: Cache raus, Version hoch, Aggregate neu zählen."""
+        seq, users = await asyncio.to_thread(self.own_db.store.poll, self.own_db.seq)
+        self.own_db.seq = seq
+        for user_id in users:
+            self.own_db.invalidate(user_id)
+            self.versions.bump(user_id)  # abgeleitete Caches & Web-Sync sehen die Änderung
+            self.stats.refresh_user(user_id, self.own_db.get(user_id, {}), self.items_by_id)
+        self.polls += 1
+        if self.polls % 3600 == 0:
+            await asyncio.to_thread(self.own_db.store.prune_changes)
+        return users
+
+    async def poll_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"[STORE POLL ERROR] {e}")
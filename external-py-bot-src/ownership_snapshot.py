@@ -0,0 +1,316 @@
+# ownership_snapshot.py
+# Binäres Besitz-Snapshot-Format (ownership.bin), wird beim Start per mmap geöffnet
+# und erst beim ersten Zugriff pro User dekodiert.
+#
+# Layout (little endian):
+#   Header   <4sHHI   magic b"BRSN", version, Anzahl Indexe, Anzahl User
+#            <H + utf-8  Index-Namen, "\n"-getrennt (muss Präfix von OWN_INDEXES sein)
+#   Tabelle  <QQI     pro User: user_id, Offset des Blobs, Länge des Blobs
+#   Blobs    <HH      Maske der vorhandenen Indexe, Bytes pro Bitmap
+#            danach pro gesetztem Masken-Bit eine Bitmap (Bit j = Item-id j besessen)
+#
+# Jeder Blob trägt seine Bitmap-Breite selbst → unveränderte User können beim
+# nächsten Snapshot 1:1 aus dem alten mmap kopiert werden.
+#
+# Konvertierung:  python ownership_snapshot.py to-json ownership.bin ownership.json
+#                 python ownership_snapshot.py to-bin ownership.json ownership.bin [--catalog brainrot_db.json]
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+
+from ownership import OWN_INDEXES, ItemIds, load_ownership, save_ownership
+
+MAGIC = b"BRSN"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_NAMES_LEN = struct.Struct("<H")
+_ENTRY = struct.Struct("<QQI")
+_BLOB_HEAD = struct.Struct("<HH")
+
+
+def encode_user(items: dict) -> bytes:
+    """{item_id: flags} → Blob mit einer Bitmap pro benutztem Index."""
+    bitmaps = [0] * len(OWN_INDEXES)
+    for item_id, flags in items.items():
+        i = 0
+        while flags:
+            if flags & 1:
+                bitmaps[i] |= 1 << item_id
+            flags >>= 1
+            i += 1
+    nbytes = max((b.bit_length() + 7) // 8 for b in bitmaps)
+    mask = 0
+    parts = []
+    for i, bitmap in enumerate(bitmaps):
+        if bitmap:
+            mask |= 1 << i
+            parts.append(bitmap.to_bytes(nbytes, "little"))
+    return _BLOB_HEAD.pack(mask, nbytes) + b"".join(parts)
+
+
+def decode_user(buf) -> dict:
+    mask, nbytes = _BLOB_HEAD.unpack_from(buf, 0)
+    pos = _BLOB_HEAD.size
+    items = {}
+    i = 0
+    while mask:
+        if mask & 1:
+            bitmap = int.from_bytes(buf[pos:pos + nbytes], "little")
+            pos += nbytes
+            bit = 1 << i
+            while bitmap:
+                low = bitmap & -bitmap
+                item_id = low.bit_length() - 1
+                items[item_id] = items.get(item_id, 0) | bit
+                bitmap ^= low
+        mask >>= 1
+        i += 1
+    return items
+
+
+class SnapshotOwnership(MutableMapping):
+    """
+    Drop-in für das OWN_DB-Dict ({user_id: {item_id: flags}}).
+    User aus dem Snapshot bleiben als (Offset, Länge) im mmap liegen, bis sie
+    zum ersten Mal gelesen oder geschrieben werden.
+
+    Jeder User ist entweder unverändert (_offsets, evtl. zusätzlich dekodiert) oder
+    geändert (_dirty, nur in _decoded). Geändert wird nur über set_bit/clear_bit/
+    update_flags bzw. Zuweisen/Löschen – nie über das von `[]` gelieferte Dict.
+    """
+
+    def __init__(self, path: str | None = None):
+        self._decoded: dict[str, dict] = {}
+        self._offsets: dict[str, tuple[int, int]] = {}
+        self._dirty: set[str] = set()
+        self._since_plan: set[str] | None = None  # seit snapshot_plan() geändert
+        self._file = None
+        self._mm = None
+        if path and os.path.exists(path) and os.path.getsize(path) > 0:
+            self._offsets = self._open(path)
+
+    def _open(self, path: str) -> dict[str, tuple[int, int]]:
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_indexes, n_users = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SystemExit(f"{path}: kein gültiger Ownership-Snapshot (v{VERSION})")
+        pos = _HEADER.size
+        (names_len,) = _NAMES_LEN.unpack_from(self._mm, pos)
+        pos += _NAMES_LEN.size
+        names = self._mm[pos:pos + names_len].decode("utf-8").split("\n")
+        if len(names) != n_indexes or names != OWN_INDEXES[:n_indexes]:
+            raise SystemExit(f"{path}: Index-Reihenfolge passt nicht zu OWN_INDEXES")
+        pos += names_len
+        table = self._mm[pos:pos + n_users * _ENTRY.size]
+        return {str(uid): (off, length) for uid, off, length in _ENTRY.iter_unpack(table)}
+
+    def _mark(self, user_id: str):
+        self._offsets.pop(user_id, None)
+        self._dirty.add(user_id)
+        if self._since_plan is not None:
+            self._since_plan.add(user_id)
+
+    # ───── Mapping-Protokoll ─────
+    def __getitem__(self, user_id: str) -> dict:
+        items = self._decoded.get(user_id)
+        if items is not None:
+            return items
+        off, length = self._offsets[user_id]  # KeyError → unbekannter User
+        items = self._decoded[user_id] = decode_user(self._mm[off:off + length])
+        return items
+
+    def __setitem__(self, user_id: str, items: dict):
+        self._decoded[user_id] = items
+        self._mark(user_id)
+
+    def __delitem__(self, user_id: str):
+        in_map = self._offsets.pop(user_id, None) is not None
+        self._decoded.pop(user_id, None)
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+        elif not in_map:
+            raise KeyError(user_id)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self._dirty or user_id in self._offsets
+
+    def __iter__(self):
+        yield from list(self._dirty)
+        yield from list(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._dirty) + len(self._offsets)
+
+    # ───── Mutationen (gleiche Schnittstelle wie SharedOwnership) ─────
+    def set_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        """Setzt ein Flag-Bit und liefert die Flags *vor* der Änderung."""
+        user_items = self.get(user_id)
+        if user_items is None:
+            user_items = self[user_id] = {}
+        old = user_items.get(item_id, 0)
+        if old | bit != old:
+            user_items[item_id] = old | bit
+            self._mark(user_id)
+        return old
+
+    def clear_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        """Löscht ein Flag-Bit (leere Items fliegen raus) und liefert die alten Flags."""
+        user_items = self.get(user_id, {})
+        old = user_items.get(item_id, 0)
+        if old & bit:
+            if old & ~bit:
+                user_items[item_id] = old & ~bit
+            else:
+                user_items.pop(item_id, None)
+            self._mark(user_id)
+        return old
+
+    def update_flags(self, user_id: str, changes: list[tuple[int, int, int]]) -> list[int]:
+        """Mehrere Items auf einmal: [(item_id, set_bits, clear_bits)] → alte Flags in gleicher Reihenfolge."""
+        user_items = self.get(user_id)
+        olds = []
+        for item_id, set_bits, clear_bits in changes:
+            old = user_items.get(item_id, 0) if user_items is not None else 0
+            new = (old | set_bits) & ~clear_bits
+            if new != old:
+                if user_items is None:
+                    user_items = self[user_id] = {}
+                if new:
+                    user_items[item_id] = new
+                else:
+                    user_items.pop(item_id, None)
+                self._mark(user_id)
+            olds.append(old)
+        return olds
+
+    @property
+    def decoded_count(self) -> int:
+        return len(self._decoded)
+
+    # ───── Snapshot schreiben ─────
+    def snapshot_plan(self) -> list[tuple[str, dict | tuple[int, int]]]:
+        """
+        Konsistenter Stand für den nächsten Snapshot, billig genug für den Event-Loop:
+        geänderte User als Kopie, alle anderen nur als (Offset, Länge) im aktuellen mmap.
+        """
+        self._since_plan = set()
+        plan = [(uid, dict(self._decoded[uid])) for uid in self._dirty]
+        plan.extend(self._offsets.items())
+        return plan
+
+    def snapshot_blobs(self, plan: list | None = None) -> list[tuple[str, bytes]]:
+        """
+        Blobs zum Plan: nur geänderte User werden kodiert, der Rest roh aus dem mmap kopiert.
+        Darf mit einem Plan im Worker-Thread laufen (bis remap() bleibt das mmap offen).
+        """
+        if plan is None:
+            plan = self.snapshot_plan()
+        mm = self._mm
+        blobs = []
+        for uid, entry in plan:
+            if isinstance(entry, dict):
+                if entry:
+                    blobs.append((uid, encode_user(entry)))
+            else:
+                off, length = entry
+                blobs.append((uid, mm[off:off + length]))
+        return blobs
+
+    def remap(self, path: str):
+        """
+        Nach dem Schreiben den neuen Snapshot mappen: geplante User gelten wieder als unverändert,
+        außer sie wurden seit snapshot_plan() erneut geändert oder gelöscht.
+        """
+        old_file, old_mm = self._file, self._mm
+        offsets = self._open(path)
+        since, self._since_plan = self._since_plan or set(), None
+        for uid, entry in offsets.items():
+            if uid in since or uid not in self:
+                continue
+            self._offsets[uid] = entry
+            self._dirty.discard(uid)
+        if old_mm is not None:
+            old_mm.close()
+            old_file.close()
+
+    def frozen(self) -> list[tuple[str, dict | bytes]]:
+        """
+        Abzug für Worker-Threads (z.B. Leaderboard-Aufbau): geänderte User als Kopie,
+        der Rest als rohe Blob-Bytes – dekodiert wird erst im Thread (iter_frozen).
+        """
+        users = [(uid, dict(self._decoded[uid])) for uid in self._dirty]
+        users.extend((uid, self._mm[off:off + length]) for uid, (off, length) in self._offsets.items())
+        return users
+
+    def release_map(self):
+        """Alles dekodieren und mmap schließen (Windows kann gemappte Dateien nicht ersetzen)."""
+        for user_id in list(self._offsets):
+            self[user_id]
+        self._dirty.update(self._offsets)  # ohne mmap gibt es nichts mehr roh zu kopieren
+        self._offsets.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+
+def iter_frozen(users: list[tuple[str, dict | bytes]]):
+    """(user_id, items)-Paare aus SnapshotOwnership.frozen(), Blobs werden unterwegs dekodiert."""
+    for uid, items in users:
+        yield uid, decode_user(items) if isinstance(items, bytes) else items
+
+
+def write_snapshot(path: str, blobs: list[tuple[str, bytes]]):
+    """Schreibt den Snapshot atomar (tmp + replace). Darf in einem Worker-Thread laufen."""
+    names = "\n".join(OWN_INDEXES).encode("utf-8")
+    head = _HEADER.pack(MAGIC, VERSION, len(OWN_INDEXES), len(blobs)) + _NAMES_LEN.pack(len(names)) + names
+    offset = len(head) + len(blobs) * _ENTRY.size
+    table = []
+    for uid, blob in blobs:
+        table.append(_ENTRY.pack(int(uid), offset, len(blob)))
+        offset += len(blob)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(b"".join(table))
+        for _, blob in blobs:
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ───── CLI: Binär ↔ JSON ─────
+def main():
+    parser = argparse.ArgumentParser(description="Convert ownership snapshots between binary and JSON")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    to_json = sub.add_parser("to-json", help="ownership.bin → ownership.json")
+    to_json.add_argument("src")
+    to_json.add_argument("dst")
+    to_bin = sub.add_parser("to-bin", help="ownership.json → ownership.bin")
+    to_bin.add_argument("src")
+    to_bin.add_argument("dst")
+    to_bin.add_argument("--catalog", default="brainrot_db.json",
+                        help="Item-Katalog, nur für alte name-keyed Dateien nötig")
+    args = parser.parse_args()
+
+    if args.cmd == "to-json":
+        own_db = SnapshotOwnership(args.src)
+        save_ownership(args.dst, {uid: own_db[uid] for uid in own_db})
+        print(f"{len(own_db)} User → {args.dst}")
+    else:
+        catalog = {}
+        if os.path.exists(args.catalog):
+            with open(args.catalog, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+        own_db = load_ownership(args.src, ItemIds(catalog), migrate_file=False)
+        write_snapshot(args.dst, [(uid, encode_user(items)) for uid, items in own_db.items() if items])
+        print(f"{len(own_db)} User → {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
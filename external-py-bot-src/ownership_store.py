@@ -0,0 +1,413 @@
+# ownership_store.py
+# Gemeinsamer Besitz-Speicher für den Sharded-Betrieb (mehrere Bot-Prozesse).
+#
+# SQLite im WAL-Modus, eine Zeile pro (User, Item) mit den Index-Bitflags.
+# Jede Mutation ist eine eigene Transaktion (BEGIN IMMEDIATE → Lesen, Upsert, Changelog),
+# damit sich Prozesse nicht gegenseitig überschreiben; Sammeländerungen eines Users
+# (update_flags) laufen gemeinsam in einer. Über die `changes`-Tabelle
+# erfahren die anderen Prozesse, welche User sie aus ihrem Cache werfen müssen.
+#
+# Selbsttest mit mehreren Shard-Prozessen hinter einem Fake-Gateway:
+#   python ownership_store.py selftest --procs 4
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+CHANGES_KEEP = 100_000  # so viele Changelog-Einträge bleiben für langsame Prozesse stehen
+
+
+class OwnershipStore:
+    def __init__(self, path: str, origin: str | None = None):
+        self.path = path
+        self.origin = origin or f"{os.getpid()}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ownership (
+                user_id TEXT    NOT NULL,
+                item_id INTEGER NOT NULL,
+                flags   INTEGER NOT NULL,
+                PRIMARY KEY (user_id, item_id)
+            ) WITHOUT ROWID""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                origin  TEXT NOT NULL
+            )""")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        self._conn.close()
+
+    def update_flags(self, user_id: str, changes: list[tuple[int, int, int]]) -> list[int]:
+        """
+        Mehrere Items eines Users in *einer* Schreibtransaktion ändern (massadd, Web-Sync …).
+        changes = [(item_id, zu setzende Bits, zu löschende Bits)] → alte Flags in gleicher Reihenfolge.
+        """
+        olds = []
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = False
+                for item_id, set_bits, clear_bits in changes:
+                    row = conn.execute("SELECT flags FROM ownership WHERE user_id = ? AND item_id = ?",
+                                       (user_id, item_id)).fetchone()
+                    old = row[0] if row else 0
+                    new = (old | set_bits) & ~clear_bits
+                    if new != old:
+                        if new:
+                            conn.execute("INSERT INTO ownership (user_id, item_id, flags) VALUES (?, ?, ?) "
+                                         "ON CONFLICT(user_id, item_id) DO UPDATE SET flags = excluded.flags",
+                                         (user_id, item_id, new))
+                        else:
+                            conn.execute("DELETE FROM ownership WHERE user_id = ? AND item_id = ?", (user_id, item_id))
+                        changed = True
+                    olds.append(old)
+                if changed:
+                    conn.execute("INSERT INTO changes (user_id, origin) VALUES (?, ?)", (user_id, self.origin))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return olds
+
+    def set_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        return self.update_flags(user_id, [(item_id, bit, 0)])[0]
+
+    def clear_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        return self.update_flags(user_id, [(item_id, 0, bit)])[0]
+
+    def replace_user(self, user_id: str, items: dict):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM ownership WHERE user_id = ?", (user_id,))
+                conn.executemany("INSERT INTO ownership (user_id, item_id, flags) VALUES (?, ?, ?)",
+                                 [(user_id, item_id, flags) for item_id, flags in items.items() if flags])
+                conn.execute("INSERT INTO changes (user_id, origin) VALUES (?, ?)", (user_id, self.origin))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load_user(self, user_id: str) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT item_id, flags FROM ownership WHERE user_id = ?", (user_id,)).fetchall()
+        return dict(rows)
+
+    def user_ids(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT user_id FROM ownership")]
+
+    def iter_users(self):
+        """
+        Alle User als (user_id, items), gestreamt über eine eigene Lese-Verbindung – ein
+        SELECT ist im WAL-Modus ein konsistenter Stand und blockiert weder Schreiber noch _lock.
+        """
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            user_id, items = None, {}
+            for uid, item_id, flags in conn.execute("SELECT user_id, item_id, flags FROM ownership ORDER BY user_id"):
+                if uid != user_id:
+                    if items:
+                        yield user_id, items
+                    user_id, items = uid, {}
+                items[item_id] = flags
+            if items:
+                yield user_id, items
+        finally:
+            conn.close()
+
+    def count_users(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT user_id) FROM ownership").fetchone()[0]
+
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def poll(self, since: int) -> tuple[int, set[str]]:
+        """Von *anderen* Prozessen geänderte User seit `since` → (neue Marke, User)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, user_id, origin FROM changes WHERE seq > ? ORDER BY seq",
+                                      (since,)).fetchall()
+        users = {uid for _, uid, origin in rows if origin != self.origin}
+        return (rows[-1][0] if rows else since), users
+
+    def changed_users(self, since: int) -> set[str] | None:
+        """
+        Alle seit `since` geänderten User (jeder Herkunft) – z.B. für den Web-Sync nach einem Neustart.
+        None, wenn der Changelog die Lücke nicht mehr abdeckt (gekürzt oder Store neu angelegt).
+        """
+        with self._lock:
+            low, high = self._conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+            if high is None:
+                return set() if since == 0 else None
+            if since > high or low > since + 1:
+                return None
+            return {r[0] for r in self._conn.execute("SELECT DISTINCT user_id FROM changes WHERE seq > ?", (since,))}
+
+    def prune_changes(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (CHANGES_KEEP,))
+
+    @property
+    def imported(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM store_meta WHERE key = 'imported'").fetchone() is not None
+
+    def import_once(self, own_db) -> bool:
+        """Übernimmt einen bestehenden Besitzstand genau einmal (erster Prozess gewinnt)."""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM store_meta WHERE key = 'imported'").fetchone():
+                    conn.execute("ROLLBACK")
+                    return False
+                for user_id in own_db:
+                    conn.executemany("INSERT OR REPLACE INTO ownership (user_id, item_id, flags) VALUES (?, ?, ?)",
+                                     [(user_id, i, f) for i, f in own_db[user_id].items() if f])
+                conn.execute("INSERT INTO store_meta (key, value) VALUES ('imported', '1')")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+
+class SharedOwnership(MutableMapping):
+    """
+    OWN_DB-Ersatz über dem OwnershipStore: User werden beim ersten Zugriff geladen
+    und gecacht; `invalidate()` wirft sie nach Änderungen anderer Prozesse wieder raus.
+    """
+
+    def __init__(self, store: OwnershipStore):
+        self.store = store
+        self._cache: dict[str, dict] = {}
+        self.seq = store.last_seq()
+
+    def __getitem__(self, user_id: str) -> dict:
+        items = self._cache.get(user_id)
+        if items is None:
+            items = self.store.load_user(user_id)
+            if not items:
+                raise KeyError(user_id)
+            self._cache[user_id] = items
+        return items
+
+    def __setitem__(self, user_id: str, items: dict):
+        self.store.replace_user(user_id, items)
+        self._cache[user_id] = dict(items)
+
+    def __delitem__(self, user_id: str):
+        self._cache.pop(user_id, None)
+        self.store.replace_user(user_id, {})
+
+    def __contains__(self, user_id) -> bool:
+        try:
+            self[user_id]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.store.user_ids())
+
+    def __len__(self) -> int:
+        return self.store.count_users()
+
+    def _apply(self, user_id: str, item_id: int, old: int, new: int):
+        cached = self._cache.get(user_id)
+        if cached is None:
+            return
+        if cached.get(item_id, 0) != old:
+            self._cache.pop(user_id, None)  # Cache war veraltet → beim nächsten Zugriff frisch laden
+        elif new:
+            cached[item_id] = new
+        else:
+            cached.pop(item_id, None)
+
+    def apply_flags(self, user_id: str, changes: list[tuple[int, int, int]], olds: list[int]):
+        """Cache nach store.update_flags nachziehen (der Store-Teil darf im Worker-Thread laufen)."""
+        for (item_id, set_bits, clear_bits), old in zip(changes, olds):
+            self._apply(user_id, item_id, old, (old | set_bits) & ~clear_bits)
+
+    def update_flags(self, user_id: str, changes: list[tuple[int, int, int]]) -> list[int]:
+        olds = self.store.update_flags(user_id, changes)
+        self.apply_flags(user_id, changes, olds)
+        return olds
+
+    def set_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        old = self.store.set_bit(user_id, item_id, bit)
+        self._apply(user_id, item_id, old, old | bit)
+        return old
+
+    def clear_bit(self, user_id: str, item_id: int, bit: int) -> int:
+        old = self.store.clear_bit(user_id, item_id, bit)
+        self._apply(user_id, item_id, old, old & ~bit)
+        return old
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id, None)
+
+    def poll(self) -> set[str]:
+        """Änderungen anderer Prozesse einsammeln und deren User aus dem Cache werfen."""
+        self.seq, users = self.store.poll(self.seq)
+        for user_id in users:
+            self.invalidate(user_id)
+        return users
+
+
+# ───── Selbsttest: mehrere Shard-Prozesse hinter einem Fake-Gateway auf einer Datei ─────
+def _test_catalog() -> dict:
+    rarities = ["Common", "Rare", "Epic", "Secret"]
+    return {item_id: {"wert": item_id * 10, "rarity": rarities[item_id % 4]} for item_id in range(1, 30)}
+
+
+class FakeGateway:
+    """Verteilt synthetische Interactions wie Discord nach Guild auf Shards: (guild_id >> 22) % shard_count."""
+
+    def __init__(self, shard_count: int):
+        self.queues = [multiprocessing.Queue() for _ in range(shard_count)]
+
+    def shard_for(self, guild_id: int) -> int:
+        return (guild_id >> 22) % len(self.queues)
+
+    def dispatch(self, guild_id: int, event: tuple):
+        self.queues[self.shard_for(guild_id)].put(event)
+
+    def close(self):
+        for queue in self.queues:
+            queue.put(None)  # Ende des Event-Streams
+
+
+def _stats_view(stats) -> dict:
+    """Vergleichbarer Stand der Leaderboard-Aggregate (Nullen/leere User raus)."""
+    view = {}
+    for user_id, values in stats.value.items():
+        values = {k: v for k, v in values.items() if v}
+        counts = {k: v for k, v in stats.index_counts.get(user_id, {}).items() if v}
+        rarities = {k: v for k, v in stats.rarity_counts.get(user_id, {}).items() if v}
+        if values or counts or rarities:
+            view[user_id] = (values, counts, rarities)
+    return view
+
+
+async def _run_shard(path: str, shard_id: int, events, barrier) -> tuple:
+    # Wie ein Bot-Prozess: der Schreibpfad und das Polling des Bots (OwnershipService),
+    # Interactions laufen nebenläufig als Tasks
+    from leaderboard import CollectionStats
+    from ownership import INDEX_BITS, OwnershipVersions
+    from ownership_service import OwnershipService
+
+    catalog = _test_catalog()
+    own_db = SharedOwnership(OwnershipStore(path, origin=f"shard-{shard_id}"))
+    stats = CollectionStats()
+    stats.rebuild(own_db, catalog)
+    service = OwnershipService(own_db, stats, OwnershipVersions(), catalog)
+    poller = asyncio.create_task(service.poll_loop(0.005))
+    counts = {"handled": 0, "added": 0, "removed": 0}
+    in_flight = asyncio.Semaphore(8)
+
+    async def interaction(op: str, user_id: str, item_ids: list[int], index: str):
+        bit = INDEX_BITS[index]
+        own_db.get(user_id, {})  # Cache füllen, damit Invalidierung zum Tragen kommt
+        changes = [(item_id, bit, 0) if op == "add" else (item_id, 0, bit) for item_id in item_ids]
+        olds = await service.update(user_id, changes)
+        hit = sum(1 for old in olds if old & bit)
+        if op == "add":
+            counts["added"] += len(olds) - hit
+        else:
+            counts["removed"] += hit
+        counts["handled"] += 1
+        in_flight.release()
+
+    tasks = []
+    while (event := await asyncio.to_thread(events.get)) is not None:
+        await in_flight.acquire()
+        tasks.append(asyncio.create_task(interaction(*event)))
+    await asyncio.gather(*tasks)
+
+    await asyncio.to_thread(barrier.wait)  # erst prüfen, wenn kein Shard mehr schreibt
+    poller.cancel()
+    await service.poll()
+    stale = sum(own_db.get(u, {}) != own_db.store.load_user(u) for u in own_db)
+    fresh = CollectionStats()
+    fresh.rebuild({u: own_db.store.load_user(u) for u in own_db.store.user_ids()}, catalog)
+    return (shard_id, counts["handled"], counts["added"], counts["removed"], stale,
+            _stats_view(stats) == _stats_view(fresh))
+
+
+def _shard_worker(path: str, shard_id: int, events, barrier, result):
+    result.put(asyncio.run(_run_shard(path, shard_id, events, barrier)))
+
+
+def selftest(path: str, procs: int, ops: int):
+    from ownership import OWN_INDEXES
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    OwnershipStore(path).close()
+
+    gateway = FakeGateway(procs)
+    barrier = multiprocessing.Barrier(procs)
+    result = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_shard_worker, args=(path, shard_id, gateway.queues[shard_id], barrier, result))
+               for shard_id in range(procs)]
+    for w in workers:
+        w.start()
+
+    # Gleiche User in vielen Guilds → dieselben User werden von mehreren Shards geändert
+    rnd = random.Random(42)
+    guilds = [rnd.getrandbits(60) for _ in range(4 * procs)]
+    for _ in range(ops * procs):
+        op = "add" if rnd.random() < 0.6 else "remove"
+        # meist ein Klick, manchmal massadd/massremove über mehrere Items
+        item_ids = rnd.sample(range(1, 30), 6 if rnd.random() < 0.1 else 1)
+        guild = rnd.choice(guilds)
+        # Gemeinsame User (schreiben mehrere Shards, Stats per Poll neu gezählt) und User, die nur
+        # in einer Guild aktiv sind (nur ein Shard → Stats rein inkrementell über OwnershipService.update)
+        user_id = f"{rnd.randrange(5)}" if rnd.random() < 0.5 else f"{guild}{rnd.randrange(3)}"
+        gateway.dispatch(guild, (op, user_id, item_ids, rnd.choice(OWN_INDEXES)))
+    gateway.close()
+
+    stats = sorted(result.get() for _ in workers)
+    for w in workers:
+        w.join()
+    added = sum(s[2] for s in stats)
+    removed = sum(s[3] for s in stats)
+    stale = sum(s[4] for s in stats)
+    stats_ok = all(s[5] for s in stats)
+    store = OwnershipStore(path)
+    bits = sum(bin(flags).count("1") for u in store.user_ids() for flags in store.load_user(u).values())
+    ok = bits == added - removed and stale == 0 and stats_ok
+    print(f"{procs} Shards, Events pro Shard {[s[1] for s in stats]}: +{added} −{removed} → {bits} Bits im Store, "
+          f"{stale} veraltete Caches, Stats {'konsistent' if stats_ok else 'ABWEICHEND'} → {'OK' if ok else 'FEHLER'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared ownership store tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    test = sub.add_parser("selftest", help="multi-process check of the bot's write/poll path behind a fake gateway")
+    test.add_argument("--path", default="ownership_selftest.db")
+    test.add_argument("--procs", type=int, default=4)
+    test.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+    raise SystemExit(0 if selftest(args.path, args.procs, args.ops) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# paginator.py
+# Seitenweise Ausgabe langer Listen (missing, type, öffentlicher Post).
+#
+# Seiten werden erst beim Anzeigen aus der Item-Sequenz erzeugt und so lange befüllt,
+# wie sie ins Embed-Budget passen – statt fester Zeilenlimits. Navigiert wird über
+# Cursor (Position des ersten Eintrags einer Seite), nicht über Seitennummern: die
+# Seitengrenzen hängen von der Zeilenlänge ab.
+# Sehr lange Listen gibt es zusätzlich als CSV, die Zeile für Zeile in eine
+# Temp-Datei geschrieben wird.
+import csv
+import io
+import tempfile
+from typing import Callable, Iterable, Sequence
+
+PAGE_BUDGET = 3500        # < 4096 (embed.description), Luft für Titel/Footer/Felder (Embed gesamt max. 6000 Zeichen)
+PAGE_MAX_LINES = 40       # lesbar bleiben, auch wenn die Zeilen kurz sind
+CSV_SPOOL = 1 << 20       # bis 1 MB im Speicher, danach auf Platte
+
+LineFormatter = Callable[[int, object], str]  # (Position in der Liste, Eintrag) → Zeile
+
+
+def page_at(items: Sequence, start: int, fmt: LineFormatter,
+            budget: int = PAGE_BUDGET, max_lines: int = PAGE_MAX_LINES) -> tuple[list[str], int]:
+    """Eine Seite ab `start` → (Zeilen, Cursor der nächsten Seite)."""
+    lines = []
+    size = 0
+    pos = start
+    while pos < len(items) and len(lines) < max_lines:
+        line = fmt(pos, items[pos])[:budget]  # eine einzelne überlange Zeile wird gekürzt
+        cost = len(line) + 1  # + Zeilenumbruch
+        if lines and size + cost > budget:
+            break
+        lines.append(line)
+        size += cost
+        pos += 1
+    return lines, pos
+
+
+def page_before(items: Sequence, cursor: int, fmt: LineFormatter,
+                budget: int = PAGE_BUDGET, max_lines: int = PAGE_MAX_LINES) -> int:
+    """Cursor der Seite, die direkt vor `cursor` endet (rückwärts befüllt)."""
+    size = 0
+    count = 0
+    pos = min(cursor, len(items))
+    while pos > 0 and count < max_lines:
+        cost = len(fmt(pos - 1, items[pos - 1])[:budget]) + 1
+        if count and size + cost > budget:
+            break
+        size += cost
+        count += 1
+        pos -= 1
+    return pos
+
+
+def write_csv(header: Sequence[str], rows: Iterable[Sequence]):
+    """
+    Schreibt die Zeilen einzeln in eine Temp-Datei (ab CSV_SPOOL auf Platte) und
+    liefert sie zurückgespult als Binärdatei – der Aufrufer schließt sie.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL, mode="w+b")
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")  # BOM → Excel erkennt UTF-8
+    writer = csv.writer(text)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+    text.flush()
+    text.detach()
+    f.seek(0)
+    return f
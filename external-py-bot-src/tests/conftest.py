@@ -0,0 +1,6 @@
+# Tests für die reine Logik der Bot-Module (ohne Discord/Netz):  python -m pytest tests
+# Die Module liegen flach neben main.py → Bot-Verzeichnis in den Importpfad.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
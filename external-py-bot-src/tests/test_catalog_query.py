@@ -0,0 +1,68 @@
+import pytest
+
+from catalog_query import CatalogColumns, CatalogQuery, format_amount, format_range, parse_number, parse_range
+from ownership import INDEX_BITS
+
+ITEMS = {
+    1: {"rarity": "Secret", "type": ["Fire"], "fixed_sets": ["Candy"], "wert": 1_500_000, "kosten": 2_000_000_000},
+    2: {"rarity": "Secret", "type": "Water, Fire", "wert": 250_000, "kosten": 750_000_000},
+    3: {"rarity": "Common", "type": [], "wert": 100, "kosten": 5_000},
+    4: {"rarity": "Brainrot God", "type": ["Water"], "fixed_sets": ["Candy Land"], "wert": 1_500_000, "kosten": 0},
+}
+NAMES = {1: "Alpha", 2: "Beta", 3: "Gamma", 4: "Delta|Dash"}
+
+
+def _query() -> CatalogQuery:
+    return CatalogQuery(CatalogColumns(ITEMS, NAMES))
+
+
+def test_parse_range():
+    assert parse_range("") == (None, None)
+    assert parse_range("1M-5B") == (1_000_000, 5_000_000_000)
+    assert parse_range(" 1.5k - ") == (1_500, None)
+    assert parse_range("-2,5m") == (None, 2_500_000)
+    assert parse_range("250K") == (250_000, 250_000)
+    for bad in ("5B-1M", "abc", "1x-2", "1M-abc"):
+        with pytest.raises(ValueError):
+            parse_range(bad)
+
+
+def test_format_is_inverse_of_parse():
+    for value in (0, 7, 999, 1_000, 1_500, 1_234_567, 250_000_000, 2_000_000_000_000):
+        assert parse_number(format_amount(value)) == value
+    for lo, hi in [(None, None), (1_000_000, 5_000_000_000), (1_500, None), (None, 2_500_000), (250_000, 250_000)]:
+        assert parse_range(format_range(lo, hi)) == (lo, hi)
+
+
+def test_filters_and_sort():
+    query = _query()
+    assert query.run(query.compile(rarity="secret")) == [1, 2]
+    assert query.run(query.compile(type="water", sort="name")) == [2, 4]
+    assert query.run(query.compile(wert="1M-", sort="cost_asc")) == [4, 1]
+    assert query.run(query.compile(set="candy")) == [1]
+    gold = INDEX_BITS["Gold"]
+    plan = query.compile(owned="missing", index="Gold", sort="value_asc")
+    assert query.run(plan, {3: gold, 1: INDEX_BITS["Normal"]}) == [2, 1, 4]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"rarity": "Brainrot God", "sort": "rarity"},
+    {"type": "Water", "set": "Candy Land", "wert": "1M-5B", "kosten": "-750M"},
+    {"rarity": "odd|name:%/ü", "owned": "owned", "index": "Diamond", "sort": "name"},
+    {"kosten": "2B", "owned": "missing", "index": list(INDEX_BITS)[-1], "sort": "cost_desc"},
+])
+def test_encode_filters_from_arg_round_trip(filters):
+    query = _query()
+    plan = query.compile(**filters)
+    assert ":" not in plan.arg                     # custom_id-Trenner
+    again = query.from_arg(plan.arg)
+    assert again is plan                           # gleicher Key → gleicher gecachter Plan
+    assert _query().from_arg(plan.arg).key == plan.key
+
+
+def test_from_arg_rejects_garbage():
+    query = _query()
+    for bad in ("", "a|b", "||||x||0", "||||||99"):
+        with pytest.raises((ValueError, IndexError)):
+            query.from_arg(bad)
@@ -0,0 +1,75 @@
+import random
+
+from leaderboard import CollectionStats, RankedBoard
+from ownership import INDEX_BITS
+
+CATALOG = {
+    1: {"rarity": "Secret", "wert": 500},
+    2: {"rarity": "Secret", "wert": 300},
+    3: {"rarity": "Common", "wert": 10},
+    4: {"rarity": "Legendary", "wert": 0},
+}
+
+
+def _nonzero(per_user: dict) -> dict:
+    """Inkrementell bleiben 0-Einträge stehen, rebuild() legt sie gar nicht erst an."""
+    return {uid: {k: v for k, v in values.items() if v} for uid, values in per_user.items()}
+
+
+def test_rank_and_top():
+    board = RankedBoard()
+    for uid, score in [("a", 5), ("b", 9), ("c", 5), ("d", 1)]:
+        board.update(uid, score)
+    assert board.top(3) == [("b", 9), ("a", 5), ("c", 5)]
+    assert [board.rank(u) for u in "abcd"] == [2, 1, 2, 4]  # Gleichstand → gleicher Rang
+    assert board.rank("x") is None and len(board) == 4
+
+    board.update("d", 10)
+    board.update("b", 0)                                 # leere Sammlung fliegt raus
+    assert board.top(10) == [("d", 10), ("a", 5), ("c", 5)]
+    assert board.rank("d") == 1 and board.rank("b") is None and board.score("b") == 0
+
+
+def test_top_matches_sorted_scores():
+    rnd = random.Random(7)
+    board, scores = RankedBoard(), {}
+    for _ in range(500):
+        uid, score = str(rnd.randint(0, 60)), rnd.choice([0, rnd.randint(1, 50)])
+        board.update(uid, score)
+        if score:
+            scores[uid] = score
+        else:
+            scores.pop(uid, None)
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+    assert board.top(20) == ranked[:20]
+    for uid, score in scores.items():
+        assert board.rank(uid) == 1 + sum(1 for s in scores.values() if s > score)
+
+
+def test_apply_matches_rebuild():
+    G, N = INDEX_BITS["Gold"], INDEX_BITS["Normal"]
+    own_db = {"u1": {1: G}, "u2": {3: N}}
+    stats = CollectionStats()
+    stats.rebuild(own_db, CATALOG)
+
+    # u1 bekommt Normal auf Item 1 (Item schon besessen), u2 ein neues Item 2, u2 verliert Item 3 komplett
+    stats.apply("u1", CATALOG[1], "Normal", +1)
+    stats.apply("u2", CATALOG[2], "Gold", +1, item_count_delta=1)
+    stats.apply("u2", CATALOG[3], "Normal", -1, item_count_delta=-1)
+    own_db = {"u1": {1: G | N}, "u2": {2: G}}
+
+    fresh = CollectionStats()
+    fresh.rebuild(own_db, CATALOG)
+    for view in ("value", "index_counts", "rarity_counts"):
+        assert _nonzero(getattr(stats, view)) == _nonzero(getattr(fresh, view)), view
+    assert stats.board(CollectionStats.OVERALL).top(2) == [("u1", 1000), ("u2", 300)]
+    assert stats.board(CollectionStats.rarity_key("Common")).top(5) == []
+
+
+def test_adopt_keeps_references():
+    stats = CollectionStats()
+    built = CollectionStats()
+    built.rebuild({"u1": {1: INDEX_BITS["Gold"]}}, CATALOG)
+    stats.adopt(built)
+    assert stats.built and stats.generation == 1
+    assert stats.user_value("u1") == 500 and stats.board(CollectionStats.OVERALL).rank("u1") == 1
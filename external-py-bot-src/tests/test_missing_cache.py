@@ -0,0 +1,60 @@
+from missing_cache import MissingCache
+from ownership import OwnershipVersions
+
+ROWS = [(1, "Secret"), (2, "Secret"), (5, "Legendary"), (9, "common")]
+
+
+class Compute:
+    """Zählt, wie oft der Cache neu rechnen musste."""
+
+    def __init__(self, rows=ROWS):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.rows)
+
+
+def test_hit_and_rarity_spans():
+    cache, compute = MissingCache(), Compute()
+    entry = cache.get("u1", "Gold", 0, 0, compute)
+    assert cache.get("u1", "Gold", 0, 0, compute) is entry and compute.calls == 1
+    assert entry.ids == (1, 2, 5, 9)
+    assert entry.by_rarity("secret") == (1, 2) and entry.by_rarity("Common") == (9,) and entry.by_rarity("OG") == ()
+
+
+def test_versions_invalidate():
+    cache, compute = MissingCache(), Compute()
+    cache.get("u1", "Gold", 0, 0, compute)
+    cache.get("u1", "Gold", 1, 0, compute)   # User hat etwas geändert
+    cache.get("u1", "Gold", 1, 1, compute)   # neuer Katalog
+    assert compute.calls == 3 and (cache.hits, cache.misses) == (0, 3)
+
+
+def test_mutation_drops_only_that_user():
+    cache, versions = MissingCache(), OwnershipVersions()
+    versions.listeners.append(cache.invalidate_user)
+    compute = Compute()
+    for uid in ("u1", "u2"):
+        for index in ("Gold", "Diamond"):
+            cache.get(uid, index, versions.version(uid), 0, compute)
+    versions.bump("u1")
+    assert not any(key[0] == "u1" for key in cache._entries) and "u1" not in cache._user_keys
+    cache.get("u2", "Gold", versions.version("u2"), 0, compute)
+    cache.get("u2", "Diamond", versions.version("u2"), 0, compute)
+    assert compute.calls == 4                # u2 weiter aus dem Cache
+    cache.get("u1", "Gold", versions.version("u1"), 0, compute)
+    assert compute.calls == 5
+
+
+def test_lru_eviction_and_clear():
+    cache, compute = MissingCache(max_entries=2), Compute()
+    cache.get("u1", "Gold", 0, 0, compute)
+    cache.get("u2", "Gold", 0, 0, compute)
+    cache.get("u1", "Gold", 0, 0, compute)   # u1 zuletzt benutzt → u2 fliegt zuerst
+    cache.get("u3", "Gold", 0, 0, compute)
+    assert set(cache._entries) == {("u1", "Gold"), ("u3", "Gold")} and "u2" not in cache._user_keys
+    cache.clear()
+    cache.get("u1", "Gold", 0, 0, compute)
+    assert compute.calls == 4
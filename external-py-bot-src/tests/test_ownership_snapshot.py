@@ -0,0 +1,70 @@
+import random
+
+from ownership import INDEX_BITS
+from ownership_snapshot import SnapshotOwnership, decode_user, encode_user, iter_frozen, write_snapshot
+
+G, N, D = INDEX_BITS["Gold"], INDEX_BITS["Normal"], INDEX_BITS["Diamond"]
+
+
+def _random_users(seed: int, n: int = 40) -> dict:
+    rnd = random.Random(seed)
+    return {str(10**17 + uid): {rnd.randint(0, 400): rnd.randint(1, 2 ** len(INDEX_BITS) - 1) for _ in range(rnd.randint(1, 30))}
+            for uid in range(n)}
+
+
+def test_encode_decode_round_trip():
+    for items in [{0: N}, {1: G | D, 7: N, 399: D}, {5: 2 ** len(INDEX_BITS) - 1}]:
+        assert decode_user(encode_user(items)) == items
+    for items in _random_users(1).values():
+        assert decode_user(encode_user(items)) == items
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    users = _random_users(2)
+    path = str(tmp_path / "ownership.bin")
+    write_snapshot(path, [(uid, encode_user(items)) for uid, items in users.items()])
+    own = SnapshotOwnership(path)
+    assert len(own) == len(users)
+    assert {uid: own[uid] for uid in own} == users
+    assert dict(iter_frozen(own.frozen())) == users
+
+
+def test_only_changed_users_are_encoded(tmp_path, monkeypatch):
+    users = _random_users(3)
+    path = str(tmp_path / "ownership.bin")
+    write_snapshot(path, [(uid, encode_user(items)) for uid, items in users.items()])
+    own = SnapshotOwnership(path)
+    first, second = list(users)[:2]
+    own[first]                       # nur gelesen → bleibt roh
+    own.set_bit(second, 1, G)
+    users[second][1] = users[second].get(1, 0) | G
+
+    encoded = []
+    monkeypatch.setattr("ownership_snapshot.encode_user", lambda items: encoded.append(items) or encode_user(items))
+    plan = own.snapshot_plan()
+    write_snapshot(path, own.snapshot_blobs(plan))
+    own.remap(path)
+    assert encoded == [users[second]]
+    assert {uid: own[uid] for uid in own} == users
+    reread = SnapshotOwnership(path)
+    assert {uid: reread[uid] for uid in reread} == users
+
+
+def test_changes_during_write_stay_dirty(tmp_path):
+    users = _random_users(4)
+    path = str(tmp_path / "ownership.bin")
+    write_snapshot(path, [(uid, encode_user(items)) for uid, items in users.items()])
+    own = SnapshotOwnership(path)
+    changed, deleted = list(users)[:2]
+    plan = own.snapshot_plan()
+    own.set_bit(changed, 2, D)       # nach dem Plan: steht nicht im neuen Snapshot
+    del own[deleted]
+    write_snapshot(path, own.snapshot_blobs(plan))
+    own.remap(path)
+    assert deleted not in own and len(own) == len(users) - 1
+    assert own[changed][2] & D
+
+    write_snapshot(path, own.snapshot_blobs())
+    own.remap(path)
+    reread = SnapshotOwnership(path)
+    assert deleted not in reread and reread[changed][2] & D
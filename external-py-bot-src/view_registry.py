@@ -0,0 +1,106 @@
+# view_registry.py
+# Speicherbegrenzte Verwaltung der langlebigen Views (Editor).
+#
+# - Geteilte, unveränderliche Item-Sequenzen pro Index (alle Editoren eines Index
+#   teilen sich ein Tupel statt jeweils eine eigene Liste zu halten)
+# - Obergrenzen für live Views pro User und global; die ältesten fliegen raus
+# - Abgelaufene Views (TTL) werden beim nächsten Zugriff aufgeräumt
+# Die Button-Callbacks laufen über persistente custom_ids (DynamicItem in main.py),
+# die über `get(key)` wieder beim passenden View landen.
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class SharedSequences:
+    """Unveränderliche Sequenzen, gecacht pro (Schlüssel, Katalog-Version)."""
+
+    def __init__(self):
+        self._seqs: dict[tuple, tuple] = {}
+
+    def get(self, key, catalog_version: int, compute: Callable[[], list]) -> tuple:
+        seq = self._seqs.get((key, catalog_version))
+        if seq is None:
+            # Alte Katalog-Versionen wegwerfen – laufende Views behalten ihre Referenz
+            for k in [k for k in self._seqs if k[1] != catalog_version]:
+                del self._seqs[k]
+            seq = self._seqs[(key, catalog_version)] = tuple(compute())
+        return seq
+
+    def __len__(self) -> int:
+        return len(self._seqs)
+
+    def approx_bytes(self) -> int:
+        return sum(sys.getsizeof(seq) for seq in self._seqs.values())
+
+
+class ViewRegistry:
+    def __init__(self, max_per_user: int = 3, max_total: int = 500, ttl: float = 600):
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.ttl = ttl
+        self._views: OrderedDict[int, tuple[float, object]] = OrderedDict()  # key → (erstellt, view)
+        self._by_user: dict[str, list[int]] = {}
+        # Startwert aus der Uhr: custom_ids alter Nachrichten (vor einem Neustart) treffen keinen neuen View
+        self._next_key = int(time.time() * 1000)
+        self.sequences = SharedSequences()
+        self.evicted = 0
+
+    def register(self, user_id: str, view) -> int:
+        """Registriert einen View und liefert seinen Schlüssel für die custom_ids."""
+        self._expire()
+        key = self._next_key
+        self._next_key += 1
+        self._views[key] = (time.monotonic(), view)
+        user_keys = self._by_user.setdefault(user_id, [])
+        user_keys.append(key)
+        while len(user_keys) > self.max_per_user:
+            self._evict(user_keys[0])
+        while len(self._views) > self.max_total:
+            self._evict(next(iter(self._views)))
+        return key
+
+    def get(self, key: int):
+        entry = self._views.get(key)
+        if entry is None:
+            return None
+        created, view = entry
+        if time.monotonic() - created > self.ttl:
+            self._evict(key)
+            return None
+        return view
+
+    def _expire(self):
+        now = time.monotonic()
+        # Einfügereihenfolge = Alter → vorne abräumen, bis der erste noch gültig ist
+        while self._views:
+            key, (created, _) = next(iter(self._views.items()))
+            if now - created <= self.ttl:
+                break
+            self._evict(key)
+
+    def _evict(self, key: int):
+        entry = self._views.pop(key, None)
+        if entry is None:
+            return
+        view = entry[1]
+        user_keys = self._by_user.get(view.user_id)
+        if user_keys is not None:
+            if key in user_keys:
+                user_keys.remove(key)
+            if not user_keys:
+                del self._by_user[view.user_id]
+        self.evicted += 1
+        if hasattr(view, "close"):
+            view.close()
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def report(self) -> str:
+        view_bytes = sum(sys.getsizeof(view) + sys.getsizeof(vars(view)) for _, view in self._views.values())
+        total = view_bytes + self.sequences.approx_bytes()
+        return (f"{len(self._views)} live views (max {self.max_total}, {self.max_per_user}/user), "
+                f"{len(self._by_user)} users, {len(self.sequences)} shared sequences, "
+                f"~{total / 1024:.1f} KB, {self.evicted} evicted")
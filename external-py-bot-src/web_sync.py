@@ -0,0 +1,373 @@
+# web_sync.py
+# Inkrementeller Abgleich zwischen Bot-Besitz (OWN_DB, id → Bitflags) und der
+# `userdata`-Tabelle der Web-App (server/index.js, brainrot.db, id-keyed JSON-Blobs).
+#
+# - Bot → Web: nur User, die seit dem letzten Lauf mutiert wurden (OwnershipVersions.pending)
+# - Web → Bot: nur Zeilen mit `updated_at` > Pull-Marke (Index auf updated_at)
+# - Konflikte: Drei-Wege-Merge pro Bit gegen den zuletzt synchronisierten Stand (base);
+#   ohne base (erster Kontakt) Vereinigung – wie mergeStats() im Frontend.
+# - Zurückschreiben nur, wenn `updated_at` noch dem gelesenen Wert entspricht
+#   (compare-and-swap); sonst wird der User in der nächsten Runde neu gemerged.
+#
+# Sync-Zustand liegt in eigenen Tabellen (bot_sync_state / bot_sync_meta) in derselben DB.
+# Lokal geänderte, noch nicht abgeglichene User überstehen einen Neustart über
+# bot_sync_pending (Snapshot-Betrieb) bzw. die Marke `store_seq` im Changelog des
+# gemeinsamen Stores (Sharded-Betrieb) – kein Vergleich aller User beim Start.
+#
+# Selbsttest gegen eine temporäre brainrot.db:  python web_sync.py selftest
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from ownership import INDEX_BITS, ItemIds, flags_to_indexes, indexes_to_flags
+
+PULL_OVERLAP = timedelta(seconds=5)  # Puffer gegen Schreibvorgänge mit leicht älterem Zeitstempel
+
+
+def _now_iso() -> str:
+    # Gleiches Format wie new Date().toISOString() → lexikografisch vergleichbar
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _shift_iso(stamp: str, delta: timedelta) -> str:
+    try:
+        dt = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return ""
+    return (dt + delta).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def merge_flags(base: dict | None, local: dict, remote: dict) -> dict:
+    """
+    Drei-Wege-Merge auf Bit-Ebene. Ein Bit ändert sich, wenn eine Seite es gegenüber
+    base geändert hat – da ein Bit nur zwei Zustände kennt, können sich beide Seiten
+    dabei nie widersprechen.
+    """
+    base = base or {}
+    merged = {}
+    for item_id in local.keys() | remote.keys() | base.keys():
+        b = base.get(item_id, 0)
+        l = local.get(item_id, 0)
+        r = remote.get(item_id, 0)
+        flags = (l & r) | (l & ~b) | (r & ~b)
+        if flags:
+            merged[item_id] = flags
+    return merged
+
+
+class WebSync:
+    def __init__(self, db_path: str, ids: ItemIds):
+        self.db_path = db_path
+        self.ids = ids
+        self._lock = threading.Lock()  # Sync-Runde und Snapshot-Thread teilen sich die Verbindung
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            # Schema wie in server/index.js, falls der Bot die DB zuerst anlegt
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS userdata (
+                    discord_user_id TEXT PRIMARY KEY,
+                    username        TEXT,
+                    avatar          TEXT,
+                    index_data      TEXT NOT NULL,
+                    trading_data    TEXT NOT NULL,
+                    updated_at      TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS userdata_updated_at ON userdata(updated_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bot_sync_state (
+                    discord_user_id   TEXT PRIMARY KEY,
+                    base              TEXT NOT NULL,
+                    remote_updated_at TEXT
+                )""")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS bot_sync_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS bot_sync_pending (discord_user_id TEXT PRIMARY KEY)")
+
+    def close(self):
+        self._conn.close()
+
+    def _meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM bot_sync_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    @property
+    def initialized(self) -> bool:
+        return self._meta("pull_mark") is not None
+
+    def load_bases(self) -> dict:
+        """Zuletzt synchronisierter Stand aller User – nur noch Rückfall, wenn nichts vorgemerkt ist (Thread)."""
+        with self._lock:
+            return {row["discord_user_id"]: {int(k): v for k, v in json.loads(row["base"]).items()}
+                    for row in self._conn.execute("SELECT discord_user_id, base FROM bot_sync_state")}
+
+    # ───── Vorgemerkte User (überstehen einen Neustart) ─────
+    def mark_pending(self, user_ids: set[str]):
+        """Lokal geänderte User vormerken – im Snapshot-Betrieb zusammen mit ownership.bin (Thread)."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO bot_sync_pending (discord_user_id) VALUES (?)",
+                                   [(uid,) for uid in user_ids])
+            self._conn.execute("INSERT OR IGNORE INTO bot_sync_meta (key, value) VALUES ('pending_tracked', '1')")
+
+    def load_pending(self) -> set[str] | None:
+        """Vorgemerkte User; None, wenn noch nie vorgemerkt wurde (DB von vor bot_sync_pending)."""
+        with self._lock:
+            if self._meta("pending_tracked") is None:
+                return None
+            return {row[0] for row in self._conn.execute("SELECT discord_user_id FROM bot_sync_pending")}
+
+    @property
+    def store_seq(self) -> int | None:
+        """Bis zu dieser Changelog-Marke des gemeinsamen Stores ist alles abgeglichen."""
+        with self._lock:
+            value = self._meta("store_seq")
+        return int(value) if value is not None else None
+
+    # ───── id-Mapping Web-Blob ↔ Bitflags ─────
+    def _known_id(self, key: str) -> int | None:
+        """Web-Key → Katalog-id des Bots; None für Unbekanntes (fremde/neuere ids, unbekannte Namen)."""
+        item_id = int(key) if key.isdigit() else self.ids.id(key)
+        return item_id if item_id in self.ids.by_id else None
+
+    def decode_index(self, index_data: dict) -> dict:
+        """{"<id>": ["Normal", ...]} → {id: flags}; alte Name-Keys werden über ItemIds gemappt."""
+        flags_by_id = {}
+        for key, variants in index_data.items():
+            item_id = self._known_id(key)
+            if item_id is None or not isinstance(variants, list):
+                continue  # bleibt als Fremddaten im Blob (encode_index)
+            flags = indexes_to_flags(variants)
+            if flags:
+                flags_by_id[item_id] = flags_by_id.get(item_id, 0) | flags
+        return flags_by_id
+
+    def encode_index(self, index_data: dict, merged: dict) -> dict:
+        """
+        Schreibt die Bot-Indexe in den Web-Blob zurück; Web-only-Varianten (Lava, Divine, ...)
+        und Einträge, die der Bot-Katalog nicht kennt, bleiben unverändert erhalten.
+        """
+        result = {}
+        for key, variants in index_data.items():
+            item_id = self._known_id(key)
+            if item_id is None or not isinstance(variants, list):
+                result[key] = variants
+                continue
+            # Bekannte Name-Keys werden dabei auf id-Keys umgestellt (siehe decode_index)
+            foreign = [v for v in variants if v not in INDEX_BITS]
+            if foreign:
+                result[str(item_id)] = result.get(str(item_id), []) + foreign
+        for item_id, flags in merged.items():
+            key = str(item_id)
+            result[key] = flags_to_indexes(flags) + result.get(key, [])
+        return result
+
+    # ───── Phase 1 (Thread): Kandidaten lesen ─────
+    def fetch(self, local_users: set[str]) -> dict:
+        """
+        Liefert {user_id: {"index": dict, "updated_at": str|None, "base": dict|None}} für
+        alle lokal geänderten User plus alle seit der Pull-Marke im Web geänderten.
+        """
+        with self._lock:
+            return self._fetch(local_users)
+
+    def _fetch(self, local_users: set[str]) -> dict:
+        mark = self._meta("pull_mark") or ""
+        since = _shift_iso(mark, -PULL_OVERLAP) if mark else ""
+        candidates = {}
+        new_mark = mark
+        rows = self._conn.execute(
+            "SELECT discord_user_id, index_data, updated_at FROM userdata WHERE updated_at > ? ORDER BY updated_at",
+            (since,)).fetchall()
+        states = self._states([r["discord_user_id"] for r in rows] + list(local_users))
+        for row in rows:
+            uid = row["discord_user_id"]
+            new_mark = max(new_mark, row["updated_at"])
+            if not uid.isdigit():
+                continue  # keine Discord-id (z.B. kaputter POST an /api/userdata) → nie in OWN_DB
+            state = states.get(uid)
+            if state and state["remote_updated_at"] == row["updated_at"] and uid not in local_users:
+                continue  # schon gesehen bzw. unser eigener Schreibvorgang
+            candidates[uid] = {"index": json.loads(row["index_data"]), "updated_at": row["updated_at"]}
+
+        missing = [uid for uid in local_users if uid not in candidates]
+        for uid in missing:
+            row = self._conn.execute(
+                "SELECT index_data, updated_at FROM userdata WHERE discord_user_id = ?", (uid,)).fetchone()
+            candidates[uid] = ({"index": json.loads(row["index_data"]), "updated_at": row["updated_at"]}
+                               if row else {"index": {}, "updated_at": None})
+
+        for uid, cand in candidates.items():
+            state = states.get(uid)
+            cand["base"] = {int(k): v for k, v in json.loads(state["base"]).items()} if state else None
+        return {"users": candidates, "pull_mark": new_mark}
+
+    def _states(self, user_ids: list[str]) -> dict:
+        states = {}
+        ids = list(set(user_ids))
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                    f"SELECT * FROM bot_sync_state WHERE discord_user_id IN ({marks})", chunk):
+                states[row["discord_user_id"]] = row
+        return states
+
+    # ───── Phase 2 (Event-Loop): mergen ─────
+    def merge(self, fetched: dict, own_db) -> dict:
+        """Berechnet pro User den Merge. Ergebnis geht an commit(); lokal anwenden macht der Aufrufer."""
+        plan = {}
+        for uid, cand in fetched["users"].items():
+            local = dict(own_db.get(uid, {}))
+            remote = self.decode_index(cand["index"])
+            merged = merge_flags(cand["base"], local, remote)
+            plan[uid] = {
+                "local": local,    # Stand, gegen den gemerged wurde → Aufrufer spielt nur das Delta ein
+                "merged": merged,
+                "write": merged != remote or any(not k.isdigit() and self._known_id(k) is not None
+                                                 for k in cand["index"]),
+                "index": cand["index"],
+                "updated_at": cand["updated_at"],
+            }
+        return {"users": plan, "pull_mark": fetched["pull_mark"]}
+
+    # ───── Phase 3 (Thread): zurückschreiben ─────
+    def commit(self, plan: dict) -> tuple[int, list[str]]:
+        """
+        Schreibt geänderte Blobs (CAS auf updated_at). Liefert (#geschrieben, Konflikt-User).
+        Abgeglichene User verlieren ihre Vormerkung; plan["store_seq"] (optional) wird als Marke übernommen.
+        """
+        written = 0
+        conflicts = []
+        with self._lock, self._conn:
+            for uid, p in plan["users"].items():
+                stamp = p["updated_at"]
+                if p["write"]:
+                    stamp = _now_iso()
+                    blob = json.dumps(self.encode_index(p["index"], p["merged"]))
+                    if p["updated_at"] is None:
+                        cur = self._conn.execute(
+                            "INSERT OR IGNORE INTO userdata (discord_user_id, username, avatar, index_data, trading_data, updated_at) "
+                            "VALUES (?, 'Unbekannt', NULL, ?, '{}', ?)", (uid, blob, stamp))
+                    else:
+                        cur = self._conn.execute(
+                            "UPDATE userdata SET index_data = ?, updated_at = ? WHERE discord_user_id = ? AND updated_at = ?",
+                            (blob, stamp, uid, p["updated_at"]))
+                    if cur.rowcount == 0:
+                        conflicts.append(uid)  # Web hat zwischendurch geschrieben → nächste Runde
+                        continue
+                    written += 1
+                self._conn.execute(
+                    "INSERT INTO bot_sync_state (discord_user_id, base, remote_updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(discord_user_id) DO UPDATE SET base = excluded.base, remote_updated_at = excluded.remote_updated_at",
+                    (uid, json.dumps({str(k): v for k, v in p["merged"].items()}), stamp))
+                self._conn.execute("DELETE FROM bot_sync_pending WHERE discord_user_id = ?", (uid,))
+            # Ab der ersten Runde deckt bot_sync_pending alle noch offenen Änderungen ab
+            marks = [("pull_mark", plan["pull_mark"]), ("store_seq", plan.get("store_seq")), ("pending_tracked", 1)]
+            self._conn.executemany(
+                "INSERT INTO bot_sync_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, str(value)) for key, value in marks if value is not None])
+        return written, conflicts
+
+
+# ───── Selbsttest: fetch → merge → commit gegen eine temporäre brainrot.db ─────
+def _sync_round(sync: WebSync, own_db: dict, users: set[str], before_commit=None) -> tuple[int, list[str]]:
+    """Eine Runde wie web_sync_once() im Bot, nur synchron und mit einem dict als OWN_DB."""
+    plan = sync.merge(sync.fetch(users), own_db)
+    for uid, p in plan["users"].items():
+        if p["merged"]:
+            own_db[uid] = dict(p["merged"])
+        else:
+            own_db.pop(uid, None)
+    if before_commit:
+        before_commit()
+    return sync.commit(plan)
+
+
+def selftest() -> bool:
+    G, N, D = INDEX_BITS["Gold"], INDEX_BITS["Normal"], INDEX_BITS["Diamond"]
+    ids = ItemIds({"Alpha": {"id": 1}, "Beta": {"id": 2}, "Gamma": {"id": 3}})
+    path = os.path.join(tempfile.mkdtemp(), "brainrot.db")
+    sync = WebSync(path, ids)
+    web = sqlite3.connect(path, isolation_level=None)  # spielt die Web-App (server/index.js)
+
+    def web_write(uid: str, blob: dict):
+        time.sleep(0.002)  # neuer updated_at-Zeitstempel
+        web.execute("INSERT INTO userdata (discord_user_id, username, avatar, index_data, trading_data, updated_at) "
+                    "VALUES (?, 'web', NULL, ?, '{}', ?) ON CONFLICT(discord_user_id) DO UPDATE SET "
+                    "index_data = excluded.index_data, updated_at = excluded.updated_at",
+                    (uid, json.dumps(blob), _now_iso()))
+
+    def web_blob(uid: str) -> dict:
+        return json.loads(web.execute("SELECT index_data FROM userdata WHERE discord_user_id = ?", (uid,)).fetchone()[0])
+
+    checks = []
+    own_db = {"100": {1: N}}
+    # 1) Erster Kontakt mit name-keyed Altdaten + Web-only-Variante + unbekanntem Item + ungültigem User
+    web_write("100", {"Beta": ["Gold", "Lava"], "Omega": ["Gold"], "999999": ["Gold"]})
+    web_write("not-a-user", {"1": ["Gold"]})
+    _sync_round(sync, own_db, set(own_db))
+    blob = web_blob("100")
+    checks.append(("Name-Keys gemappt, Vereinigung",
+                   own_db == {"100": {1: N, 2: G}} and blob.get("2") == ["Gold", "Lava"] and blob.get("1") == ["Normal"]))
+    checks.append(("Fremddaten bleiben", blob.get("Omega") == ["Gold"] and blob.get("999999") == ["Gold"]
+                   and "not-a-user" not in own_db))
+
+    # 2) Änderung im Web wird übernommen (ohne lokale Änderung)
+    web_write("100", dict(blob, **{"3": ["Diamond"]}))
+    _sync_round(sync, own_db, set())
+    checks.append(("Web-Änderung", own_db["100"].get(3) == D))
+
+    # 3) Lokales Entfernen setzt sich gegen den alten Web-Stand durch (Drei-Wege-Merge)
+    del own_db["100"][2]
+    _sync_round(sync, own_db, {"100"})
+    blob = web_blob("100")
+    checks.append(("Lokales Entfernen", 2 not in own_db["100"] and blob.get("2") == ["Lava"]))
+
+    # 4) CAS-Konflikt: Web schreibt zwischen fetch und commit → nichts überschrieben, nächste Runde mergt
+    own_db["100"][1] |= G
+    written, conflicts = _sync_round(sync, own_db, {"100"},
+                                     before_commit=lambda: web_write("100", dict(web_blob("100"), **{"2": ["Diamond", "Lava"]})))
+    checks.append(("Konflikt erkannt", written == 0 and conflicts == ["100"]
+                   and web_blob("100").get("1") == ["Normal"]))
+    _sync_round(sync, own_db, set(conflicts))
+    blob = web_blob("100")
+    checks.append(("Konflikt aufgelöst", own_db["100"] == {1: N | G, 2: D, 3: D}
+                   and blob.get("1") == ["Normal", "Gold"] and blob.get("2") == ["Diamond", "Lava"]))
+
+    # 5) Neustart: vorgemerkte, nie gepushte Änderungen kommen aus bot_sync_pending zurück
+    del own_db["100"][3]
+    sync.mark_pending({"100"})  # macht der Bot zusammen mit dem Snapshot
+    restarted = WebSync(path, ids)
+    pending = restarted.load_pending()
+    checks.append(("Neustart findet Vormerkung", pending == {"100"}))
+    plan = restarted.merge(restarted.fetch(pending), own_db)
+    plan["store_seq"] = 42
+    restarted.commit(plan)
+    checks.append(("Vormerkung nach Abgleich weg", restarted.load_pending() == set() and restarted.store_seq == 42
+                   and 3 not in own_db["100"] and "3" not in web_blob("100")))
+    restarted.close()
+
+    web.close()
+    sync.close()
+    ok = all(passed for _, passed in checks)
+    for name, passed in checks:
+        print(f"  {'OK    ' if passed else 'FEHLER'} {name}")
+    print(f"Web-Sync gegen {path}: {'OK' if ok else 'FEHLER'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web sync tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("selftest", help="fetch/merge/commit against a temporary brainrot.db")
+    parser.parse_args()
+    raise SystemExit(0 if selftest() else 1)
+
+
+if __name__ == "__main__":
+    main()